@@ -0,0 +1,30 @@
+from typing import List
+
+from pydantic import BaseModel, model_validator
+
+
+class ChapterItem(BaseModel):
+    chapter_id: int
+    chapter_name: str
+
+
+class SectionChapters(BaseModel):
+    section_name: str
+    chapters: List[ChapterItem]
+
+
+class CourseChaptersRequest(BaseModel):
+    course_name: str
+    intro: str
+    sections: List[SectionChapters]
+
+    @model_validator(mode="after")
+    def check_unique_chapter_ids(self):
+        # 章節以 chapter_id 記錄進度並寫回 Web API，重複的 id 會被重複計算
+        seen = set()
+        for section in self.sections:
+            for chapter in section.chapters:
+                if chapter.chapter_id in seen:
+                    raise ValueError(f"Duplicate chapter_id: {chapter.chapter_id}")
+                seen.add(chapter.chapter_id)
+        return self
@@ -1,6 +1,8 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from domain.models.knowledge import NAMESPACE_PATTERN
 
 
 class KnowledgeItem(BaseModel):
@@ -9,3 +11,4 @@ class KnowledgeItem(BaseModel):
 
 class KnowledgeRequest(BaseModel):
     knowledge: List[KnowledgeItem]
+    namespace: Optional[str] = Field(default=None, pattern=NAMESPACE_PATTERN)
@@ -1,6 +1,8 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from domain.models.knowledge import NAMESPACE_PATTERN
 
 
 class UserAnswerSection(BaseModel):
@@ -11,3 +13,5 @@ class UserAnswerSection(BaseModel):
 class UserFeedbackRequest(BaseModel):
     user_id: int
     user_answer: List[UserAnswerSection]
+    # 未指定時使用生成問題時選擇的知識分區
+    namespace: Optional[str] = Field(default=None, pattern=NAMESPACE_PATTERN)
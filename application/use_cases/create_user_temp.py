@@ -1,18 +1,43 @@
-from domain.services.temporary_file_service import TemporaryFileService
+import asyncio
+from typing import Optional
+
+from domain.services.session_store import SessionStore
 
 
 class CreateUserTempUseCase:
     """
-    創建使用者暫存檔
+    創建使用者暫存資料
     """
 
-    def __init__(self, temp_file_name: str):
-        self.temp_file_service = TemporaryFileService(temp_file_name)
+    def __init__(self, session_store: SessionStore):
+        self.session_store = session_store
+
+    def execute(
+        self,
+        user_id: str,
+        user_input: str,
+        temp_data: dict,
+        search_query: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ):
+        self.session_store.set(
+            user_id,
+            {
+                "user_question": user_input,
+                "questions": temp_data["questions"],
+                "search_query": search_query,  # 生成問題時產生的搜尋關鍵字
+                "namespace": namespace,  # 向量檢索使用的知識分區
+            },
+        )
 
-    def execute(self, user_id: str, user_input: str, temp_data: dict):
-        data = self.temp_file_service.load_temp_data()
-        data[user_id] = {
-            "user_question": user_input,
-            "questions": temp_data["questions"],
-        }
-        self.temp_file_service.save_temp_data(data)
+    async def execute_async(
+        self,
+        user_id: str,
+        user_input: str,
+        temp_data: dict,
+        search_query: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ):
+        await asyncio.to_thread(
+            self.execute, user_id, user_input, temp_data, search_query, namespace
+        )
@@ -1,6 +1,11 @@
+from typing import AsyncIterator
+
 from application.dto.course_content import CourseContentRequest
 from application.use_cases.prompt_loader import PromptLoader
+from domain.services.gemini_scheduler import PRIORITY_DEFAULT
 from domain.services.gemini_service import GeminiService
+from domain.services.generation_profile import PROFILE_CHAPTER
+from infrastructure.metrics.metrics import stage
 
 
 class GenerateChapterContentUseCase:
@@ -12,19 +17,19 @@ class GenerateChapterContentUseCase:
         self,
         gemini_service: GeminiService,
         content_prompt_template_file_name_1: str,
-        practice_prompt_template_file_name_2: str,
     ):
         self.gemini_service = gemini_service
-        self.content_prompt_loader = PromptLoader(content_prompt_template_file_name_1)
-        self.practice_prompt_loader = PromptLoader(practice_prompt_template_file_name_2)
+        self.content_prompt_loader = PromptLoader(
+            content_prompt_template_file_name_1,
+            placeholders={"courseName", "intro", "sectionName", "chapterName"},
+        )
 
-    def execute(self, request: CourseContentRequest, response_schema=None) -> str:
+    def _build_prompt(self, request: CourseContentRequest) -> str:
         course_name = request.course_name
         course_intro = request.intro
         section_name = request.section_name
         chapter_name = request.chapter_name
         content_prompt_template = self.content_prompt_loader.load_prompt()
-        practice_prompt_template = self.practice_prompt_loader.load_prompt()
         content_prompt = content_prompt_template.format(
             courseName=course_name,
             intro=course_intro,
@@ -32,6 +37,39 @@ class GenerateChapterContentUseCase:
             chapterName=chapter_name,
         )
         # practice_prompt = ""
-        return self.gemini_service.generate_answer(
-            content_prompt, response_schema=response_schema
+        return content_prompt
+
+    def execute(self, request: CourseContentRequest, response_schema=None) -> str:
+        with stage("prompt_build"):
+            prompt = self._build_prompt(request)
+        with stage("generate_chapter_content"):
+            return self.gemini_service.generate_answer(
+                prompt, response_schema=response_schema, profile=PROFILE_CHAPTER
+            )
+
+    async def execute_async(
+        self,
+        request: CourseContentRequest,
+        response_schema=None,
+        priority: int = PRIORITY_DEFAULT,
+        bypass_cache: bool = False,
+    ) -> str:
+        with stage("prompt_build"):
+            prompt = self._build_prompt(request)
+        with stage("generate_chapter_content"):
+            return await self.gemini_service.generate_answer_async(
+                prompt,
+                response_schema=response_schema,
+                priority=priority,
+                profile=PROFILE_CHAPTER,
+                bypass_cache=bypass_cache,
+            )
+
+    def stream_async(
+        self, request: CourseContentRequest, response_schema=None
+    ) -> AsyncIterator[str]:
+        with stage("prompt_build"):
+            prompt = self._build_prompt(request)
+        return self.gemini_service.generate_answer_stream_async(
+            prompt, response_schema=response_schema, profile=PROFILE_CHAPTER
         )
@@ -1,15 +1,29 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
 from application.dto.user_feedback import UserFeedbackRequest
 from application.use_cases.prompt_engineer import PromptEngineer
 from application.use_cases.prompt_loader import PromptLoader
 from domain.services.gemini_service import GeminiService
-from domain.services.temporary_file_service import TemporaryFileService
+from domain.services.generation_profile import PROFILE_COURSE
+from domain.services.session_store import SessionNotFoundError, SessionStore
 from infrastructure.db.vector_db import VectorDB
 from infrastructure.external.google_search import GoogleSearch
+from infrastructure.metrics.metrics import (
+    end_trace,
+    get_metrics_registry,
+    stage,
+    start_trace,
+)
 
 
 class GenerateCourseUseCase:
     """
     生成課程大綱
+
+    生成問題後可呼叫 start_prefetch 在使用者作答期間先完成 Google 搜尋與向量檢索，
+    結果存入 session；生成課程時若預取結果仍有效即直接使用，否則照原流程重新檢索。
     """
 
     def __init__(
@@ -18,24 +32,71 @@ class GenerateCourseUseCase:
         vector_db: VectorDB,
         google_search: GoogleSearch,
         prompt_template_file_name: str,
-        temp_file_name: str,
+        session_store: SessionStore,
+        context_token_budget: Optional[int] = None,
+        prefetch_ttl: float = 600.0,
     ):
-        self.temp_file_service = TemporaryFileService(temp_file_name)
+        self.session_store = session_store
         self.gemini_service = gemini_service
         self.vector_db = vector_db
         self.google_search = google_search
         self.prompt_engineer = PromptEngineer()
-        self.prompt_loader = PromptLoader(prompt_template_file_name)
+        self.context_token_budget = context_token_budget
+        self.prefetch_ttl = prefetch_ttl
+        self._prefetches: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self.prefetch_total = get_metrics_registry().counter(
+            "retrieval_prefetch_total",
+            "Retrieval prefetch outcomes for generate_course",
+            ("outcome",),
+        )
+        self.prompt_loader = PromptLoader(
+            prompt_template_file_name,
+            placeholders={"text1", "text2", "userInput", "goal"},
+        )
 
-    def execute(self, request: UserFeedbackRequest, response_schema=None) -> str:
-        temp_data = self.temp_file_service.load_temp_data()
-        # print(temp_data[request.user_id])
-        user_input = temp_data[request.user_id]["user_question"]
-        search_query = self.gemini_service.generate_search_query(user_input)
-        google_results = self.google_search.search(search_query, max_results=10)
-        vector_results = self.vector_db.query(user_input, search_limit=10)
-        text1 = self.prompt_engineer.build_rag_vector_prompt(vector_results)
-        text2 = self.prompt_engineer.build_rag_google_search_prompt(google_results)
+    def _load_session(self, request: UserFeedbackRequest) -> dict:
+        temp_data = self.session_store.get(request.user_id)
+        if temp_data is None:
+            raise SessionNotFoundError(
+                f"No session found for user {request.user_id}, it may have expired"
+            )
+        return temp_data
+
+    @staticmethod
+    def _namespace(request: UserFeedbackRequest, session: dict) -> Optional[str]:
+        return request.namespace or session.get("namespace")
+
+    def _fresh_prefetch(
+        self, session: dict, namespace: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        取出 session 中仍有效的預取結果 (同一個問題、同一個知識分區且未超過 prefetch_ttl)
+        """
+        prefetch = session.get("prefetch")
+        if not prefetch:
+            self.prefetch_total.inc(outcome="miss")
+            return None
+        if (
+            prefetch["user_question"] != session["user_question"]
+            or prefetch.get("namespace") != namespace
+            or time.time() - prefetch["created_at"] > self.prefetch_ttl
+        ):
+            self.prefetch_total.inc(outcome="stale")
+            return None
+        self.prefetch_total.inc(outcome="hit")
+        return prefetch
+
+    def _build_prompt(
+        self,
+        request: UserFeedbackRequest,
+        user_input: str,
+        vector_results: list,
+        google_results: list,
+    ) -> str:
+        context = self.prompt_engineer.build_rag_context(
+            vector_results, google_results, token_budget=self.context_token_budget
+        )
+        text1, text2 = context.vector_text, context.google_text
         goal = ""  # 學習目標
         for index, answer in enumerate(request.user_answer):
             goal += f"{index + 1}. {answer.question_text} \n"
@@ -46,6 +107,159 @@ class GenerateCourseUseCase:
             text1=text1, text2=text2, userInput=user_input, goal=goal
         )
         print(f"Final Prompt:\n{prompt}")
-        return self.gemini_service.generate_answer(
-            prompt, response_schema=response_schema
+        return prompt
+
+    def _vector_query(self, user_input: str, namespace: Optional[str] = None) -> list:
+        with stage("vector_query"):
+            return self.vector_db.query(
+                user_input, search_limit=10, namespace=namespace
+            )
+
+    def execute(self, request: UserFeedbackRequest, response_schema=None) -> str:
+        with stage("load_session"):
+            session = self._load_session(request)
+        user_input = session["user_question"]
+        namespace = self._namespace(request, session)
+        prefetch = self._fresh_prefetch(session, namespace)
+        if prefetch is not None:
+            google_results = prefetch["google_results"]
+            vector_results = prefetch["vector_results"]
+        else:
+            search_query = session.get("search_query")
+            if search_query is None:
+                with stage("search_query"):
+                    search_query = self.gemini_service.generate_search_query(user_input)
+            with stage("google_search"):
+                google_results = self.google_search.search(search_query, max_results=10)
+            vector_results = self._vector_query(user_input, namespace)
+        with stage("prompt_build"):
+            prompt = self._build_prompt(
+                request, user_input, vector_results, google_results
+            )
+        with stage("generate_answer"):
+            return self.gemini_service.generate_answer(
+                prompt, response_schema=response_schema, profile=PROFILE_COURSE
+            )
+
+    async def _google_retrieval_async(
+        self, user_input: str, search_query: Optional[str] = None
+    ) -> list:
+        if search_query is None:
+            with stage("search_query"):
+                search_query = await self.gemini_service.generate_search_query_async(
+                    user_input
+                )
+        with stage("google_search"):
+            return await self.google_search.search_async(search_query, max_results=10)
+
+    async def retrieve_async(
+        self,
+        user_input: str,
+        search_query: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ) -> tuple:
+        """
+        同時執行 Google 搜尋 (含搜尋關鍵字生成) 與向量檢索，
+        耗時取決於較慢的一方而非兩者相加；已有 search_query 時不再呼叫 Gemini 生成
+        向量檢索只查詢 namespace 對應的知識分區
+
+        Returns:
+            (google_results, vector_results)
+        """
+        return await asyncio.gather(
+            self._google_retrieval_async(user_input, search_query),
+            asyncio.to_thread(self._vector_query, user_input, namespace),
+        )
+
+    async def _prefetch(
+        self,
+        user_id: str,
+        user_input: str,
+        search_query: Optional[str],
+        namespace: Optional[str],
+    ) -> Optional[dict]:
+        # 以獨立的 trace 記錄，避免將耗時計入觸發預取的 generate_questions 請求
+        _, token = start_trace("PREFETCH", "generate_course")
+        try:
+            google_results, vector_results = await self.retrieve_async(
+                user_input, search_query, namespace
+            )
+            prefetch = {
+                "user_question": user_input,
+                "namespace": namespace,
+                "google_results": google_results,
+                "vector_results": [list(result) for result in vector_results],
+                "created_at": time.time(),
+            }
+            stored = await asyncio.to_thread(
+                self.session_store.update, user_id, {"prefetch": prefetch}
+            )
+            if not stored:
+                print(f"[GenerateCourseUseCase] Session {user_id} gone, drop prefetch")
+            return prefetch
+        except Exception as e:
+            self.prefetch_total.inc(outcome="failed")
+            print(f"[GenerateCourseUseCase] Prefetch failed for {user_id}: {e}")
+            return None
+        finally:
+            end_trace(token)
+
+    def start_prefetch(
+        self,
+        user_id: str,
+        user_input: str,
+        search_query: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ) -> asyncio.Task:
+        """
+        在背景預先執行檢索，需在 session 建立之後呼叫
+        """
+        key = str(user_id)
+        task = asyncio.create_task(
+            self._prefetch(key, user_input, search_query, namespace)
+        )
+        self._prefetches[key] = ((user_input, namespace), task)
+
+        def _discard(done: asyncio.Task):
+            if self._prefetches.get(key, (None, None))[1] is done:
+                del self._prefetches[key]
+
+        task.add_done_callback(_discard)
+        return task
+
+    async def _retrieve_for_session_async(
+        self, user_id: str, session: dict, namespace: Optional[str] = None
+    ) -> tuple:
+        user_input = session["user_question"]
+        pending = self._prefetches.get(str(user_id))
+        if pending is not None and pending[0] == (user_input, namespace):
+            # 同一行程中預取尚未完成，等待它比重新檢索快
+            with stage("prefetch_wait"):
+                prefetch = await asyncio.shield(pending[1])
+            if prefetch is not None:
+                self.prefetch_total.inc(outcome="waited")
+                return prefetch["google_results"], prefetch["vector_results"]
+        prefetch = self._fresh_prefetch(session, namespace)
+        if prefetch is not None:
+            return prefetch["google_results"], prefetch["vector_results"]
+        return await self.retrieve_async(
+            user_input, session.get("search_query"), namespace
+        )
+
+    async def execute_async(
+        self, request: UserFeedbackRequest, response_schema=None
+    ) -> str:
+        with stage("load_session"):
+            session = await asyncio.to_thread(self._load_session, request)
+        user_input = session["user_question"]
+        google_results, vector_results = await self._retrieve_for_session_async(
+            request.user_id, session, self._namespace(request, session)
         )
+        with stage("prompt_build"):
+            prompt = self._build_prompt(
+                request, user_input, vector_results, google_results
+            )
+        with stage("generate_answer"):
+            return await self.gemini_service.generate_answer_async(
+                prompt, response_schema=response_schema, profile=PROFILE_COURSE
+            )
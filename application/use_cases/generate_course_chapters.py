@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+from application.dto.course_chapters import CourseChaptersRequest
+from application.dto.course_content import CourseContentRequest, CourseContentResponse
+from application.use_cases.generate_chapter_content import GenerateChapterContentUseCase
+from application.use_cases.outbox_dispatcher import OutboxDispatcher
+from domain.services.gemini_scheduler import PRIORITY_BULK
+from domain.services.job_tracker import JobTracker
+
+
+class GenerateCourseChaptersUseCase:
+    """
+    批次生成整門課程的章節內容
+
+    以 semaphore 限制同時生成的章節數量，失敗的章節以指數退避重試，
+    每完成一個章節就立即排入 outbox 寫回 Web API，並透過 JobTracker 回報進度。
+    JobTracker 可能是 SQLite (寫入時需取得鎖)，在 event loop 中一律經由 asyncio.to_thread 呼叫。
+    """
+
+    job_kind = "generate_course_chapters"
+
+    def __init__(
+        self,
+        chapter_content_use_case: GenerateChapterContentUseCase,
+        outbox_dispatcher: OutboxDispatcher,
+        job_tracker: JobTracker,
+        max_concurrency: int = 4,
+        max_retries: int = 2,
+        retry_backoff: float = 1.0,
+    ):
+        self.chapter_content_use_case = chapter_content_use_case
+        self.outbox_dispatcher = outbox_dispatcher
+        self.job_tracker = job_tracker
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @staticmethod
+    def _chapter_requests(request: CourseChaptersRequest) -> list:
+        return [
+            CourseContentRequest(
+                course_name=request.course_name,
+                intro=request.intro,
+                section_name=section.section_name,
+                chapter_id=chapter.chapter_id,
+                chapter_name=chapter.chapter_name,
+            )
+            for section in request.sections
+            for chapter in section.chapters
+        ]
+
+    def create_job(self, request: CourseChaptersRequest) -> str:
+        return self.job_tracker.create(
+            self.job_kind, total=len(self._chapter_requests(request))
+        )
+
+    async def create_job_async(self, request: CourseChaptersRequest) -> str:
+        return await asyncio.to_thread(self.create_job, request)
+
+    async def _generate_chapter(
+        self, chapter_request: CourseContentRequest, bypass_cache: bool = False
+    ):
+        chapter_content = json.loads(
+            await self.chapter_content_use_case.execute_async(
+                chapter_request,
+                response_schema=CourseContentResponse,
+                priority=PRIORITY_BULK,  # 讓互動式請求優先使用 Gemini 配額
+                bypass_cache=bypass_cache,
+            )
+        )
+        CourseContentResponse.model_validate(chapter_content)
+        await self.outbox_dispatcher.enqueue_async(
+            "PUT",
+            endpoint=f"chapters/{chapter_request.chapter_id}",
+            payload=chapter_content,
+        )
+
+    async def _run_chapter(
+        self,
+        job_id: str,
+        chapter_request: CourseContentRequest,
+        semaphore: asyncio.Semaphore,
+    ):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    # 重試時略過回應快取，確實重新呼叫模型
+                    await self._generate_chapter(
+                        chapter_request, bypass_cache=attempt > 0
+                    )
+                await asyncio.to_thread(
+                    self.job_tracker.mark_item,
+                    job_id,
+                    chapter_request.chapter_id,
+                    "completed",
+                )
+                return
+            except Exception as e:
+                print(
+                    f"[GenerateCourseChaptersUseCase] Chapter {chapter_request.chapter_id} "
+                    f"attempt {attempt + 1} failed: {e}"
+                )
+                if attempt == self.max_retries:
+                    await asyncio.to_thread(
+                        self.job_tracker.mark_item,
+                        job_id,
+                        chapter_request.chapter_id,
+                        "failed",
+                        str(e),
+                    )
+                    return
+                # 退避期間釋放 semaphore，讓其他章節可以先生成
+                await asyncio.sleep(self.retry_backoff * (2**attempt))
+
+    async def execute_async(self, job_id: str, request: CourseChaptersRequest):
+        await asyncio.to_thread(self.job_tracker.set_status, job_id, "running")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        await asyncio.gather(
+            *(
+                self._run_chapter(job_id, chapter_request, semaphore)
+                for chapter_request in self._chapter_requests(request)
+            )
+        )
+        job = await asyncio.to_thread(self.job_tracker.get, job_id)
+        if job is None:
+            # 工作紀錄已因超過 max_jobs 被移除
+            print(f"[GenerateCourseChaptersUseCase] Job {job_id} no longer tracked")
+            return
+        await asyncio.to_thread(
+            self.job_tracker.set_status,
+            job_id,
+            "completed" if job["failed"] == 0 else "completed_with_errors",
+        )
@@ -1,5 +1,6 @@
 from application.use_cases.prompt_loader import PromptLoader
 from domain.services.gemini_service import GeminiService
+from infrastructure.metrics.metrics import stage
 
 
 class GenerateQuestionsUseCase:
@@ -9,16 +10,48 @@ class GenerateQuestionsUseCase:
 
     def __init__(self, gemini_service: GeminiService, prompt_template_file_name: str):
         self.gemini_service = gemini_service
-        self.prompt_loader = PromptLoader(prompt_template_file_name)
+        self.prompt_loader = PromptLoader(
+            prompt_template_file_name, placeholders={"topic"}
+        )
 
-    def execute(self, user_input: str, response_schema=None):
-        topic = self.gemini_service.generate_search_query(user_input)
+    def _build_prompt(self, topic: str) -> str:
         prompt_template = self.prompt_loader.load_prompt()
         prompt = prompt_template.format(topic=topic)
         print(f"Final Prompt: {prompt}")
+        return prompt
+
+    def execute(self, user_input: str, response_schema=None):
+        with stage("search_query"):
+            topic = self.gemini_service.generate_search_query(user_input)
+        with stage("prompt_build"):
+            prompt = self._build_prompt(topic)
         # print(
         #     f"Generated: {self.gemini_service.generate_question(prompt, response_schema=response_schema)}"
         # )
-        return self.gemini_service.generate_question(
-            prompt, response_schema=response_schema
+        with stage("generate_questions"):
+            return self.gemini_service.generate_question(
+                prompt, response_schema=response_schema, semantic_text=topic
+            )
+
+    async def execute_async(self, user_input: str, response_schema=None):
+        questions, _ = await self.execute_with_search_query_async(
+            user_input, response_schema=response_schema
         )
+        return questions
+
+    async def execute_with_search_query_async(
+        self, user_input: str, response_schema=None
+    ) -> tuple:
+        """
+        Returns:
+            (生成的問題, 搜尋關鍵字)，搜尋關鍵字可存入 session 供生成課程時重複使用
+        """
+        with stage("search_query"):
+            topic = await self.gemini_service.generate_search_query_async(user_input)
+        with stage("prompt_build"):
+            prompt = self._build_prompt(topic)
+        with stage("generate_questions"):
+            questions = await self.gemini_service.generate_question_async(
+                prompt, response_schema=response_schema, semantic_text=topic
+            )
+        return questions, topic
@@ -0,0 +1,89 @@
+import threading
+from typing import List
+
+from application.use_cases.insert_knowledge import InsertKnowledgeUseCase
+from infrastructure.queue.ingestion_queue import IngestionQueue, LeaseLostError
+
+
+class IngestionWorkerPool:
+    """
+    在背景執行緒中處理知識新增佇列
+
+    embedding 與 upsert 都是阻塞呼叫，放在獨立執行緒中不會佔用 event loop；
+    啟動時會先將租約已到期 (上次中斷) 的工作重新排入佇列，其他 worker 行程執行中的工作不受影響。
+    """
+
+    def __init__(
+        self,
+        ingestion_queue: IngestionQueue,
+        insert_knowledge_use_case: InsertKnowledgeUseCase,
+        workers: int = 2,
+        poll_interval: float = 5.0,
+        max_attempts: int = 3,
+    ):
+        self.ingestion_queue = ingestion_queue
+        self.insert_knowledge_use_case = insert_knowledge_use_case
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        requeued = self.ingestion_queue.requeue_interrupted()
+        if requeued:
+            print(f"[IngestionWorkerPool] Resuming {requeued} interrupted job(s)")
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"ingestion-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """
+        有新工作排入時喚醒 worker，不必等到下一次輪詢
+        """
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.ingestion_queue.claim_next()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            job_id, lease_owner = job["job_id"], job["lease_owner"]
+            try:
+                stats = self.insert_knowledge_use_case.run_job(job)
+                self.ingestion_queue.finish(job_id, lease_owner, "completed")
+                self.insert_knowledge_use_case.discard_source(job)
+                print(
+                    f"[IngestionWorkerPool] Job {job_id} completed: "
+                    f"{stats['inserted']} inserted"
+                )
+            except LeaseLostError:
+                # 租約到期後已由其他 worker 接手，不再更新這個工作
+                print(f"[IngestionWorkerPool] Job {job_id} was taken over, stopping")
+            except Exception as e:
+                # 已寫入的進度保留在佇列中，重新排入後會從中斷位置繼續
+                print(f"[IngestionWorkerPool] Job {job_id} failed: {e}")
+                try:
+                    if job["attempts"] + 1 < self.max_attempts:
+                        self.ingestion_queue.requeue(job_id, lease_owner, str(e))
+                    else:
+                        self.ingestion_queue.finish(
+                            job_id, lease_owner, "failed", str(e)
+                        )
+                        self.insert_knowledge_use_case.discard_source(job)
+                except LeaseLostError:
+                    print(f"[IngestionWorkerPool] Job {job_id} was taken over")
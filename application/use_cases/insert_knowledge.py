@@ -1,18 +1,135 @@
-from typing import List
-
-from sentence_transformers import SentenceTransformer
+import asyncio
+import os
+from typing import Iterable, Iterator, List, Optional
 
 from infrastructure.db.vector_db import VectorDB
+from infrastructure.embedding.embedding_backend import EmbeddingBackend
+from infrastructure.ingestion.document_reader import (
+    ReadProgress,
+    iter_documents,
+    iter_list_documents,
+)
+from infrastructure.ingestion.parallel_chunker import ParallelChunker
+from infrastructure.queue.ingestion_queue import IngestionQueue
 
 
 class InsertKnowledgeUseCase:
     """
     新增向量知識庫內容
+
+    有設定 ingestion_queue 時，請求只負責排入佇列，實際寫入由背景 worker 呼叫 run_job 完成。
+    上傳的檔案 (txt / md / jsonl) 由 worker 逐段讀取，有設定 chunker 時以多個行程切割。
     """
 
-    def __init__(self, vector_db: VectorDB, embedding_model: SentenceTransformer):
+    def __init__(
+        self,
+        vector_db: VectorDB,
+        embedding_model: EmbeddingBackend,
+        ingestion_queue: Optional[IngestionQueue] = None,
+        chunker: Optional[ParallelChunker] = None,
+        max_document_chars: int = 20000,
+    ):
         self.vector_db = vector_db
         self.embedding_model = embedding_model
+        self.ingestion_queue = ingestion_queue
+        self.chunker = chunker
+        self.max_document_chars = max_document_chars
+
+    def execute(
+        self, knowledge_list: Iterable[str], namespace: Optional[str] = None
+    ) -> dict:
+        return self.vector_db.insert_vectors(
+            knowledge_list, self.embedding_model, namespace=namespace
+        )
+
+    async def execute_async(
+        self, knowledge_list: Iterable[str], namespace: Optional[str] = None
+    ) -> dict:
+        return await asyncio.to_thread(self.execute, knowledge_list, namespace)
+
+    def enqueue(
+        self, knowledge_list: List[str], namespace: Optional[str] = None
+    ) -> str:
+        return self.ingestion_queue.enqueue(list(knowledge_list), namespace)
+
+    async def enqueue_async(
+        self, knowledge_list: List[str], namespace: Optional[str] = None
+    ) -> str:
+        return await asyncio.to_thread(self.enqueue, knowledge_list, namespace)
+
+    def enqueue_file(
+        self,
+        source_path: str,
+        source_format: str,
+        namespace: Optional[str] = None,
+        total_bytes: Optional[int] = None,
+    ) -> str:
+        return self.ingestion_queue.enqueue_file(
+            source_path, source_format, namespace, total_bytes
+        )
+
+    async def enqueue_file_async(
+        self,
+        source_path: str,
+        source_format: str,
+        namespace: Optional[str] = None,
+        total_bytes: Optional[int] = None,
+    ) -> str:
+        return await asyncio.to_thread(
+            self.enqueue_file, source_path, source_format, namespace, total_bytes
+        )
+
+    def _documents(self, job: dict, progress: ReadProgress) -> Iterator[str]:
+        if job.get("source_path"):
+            return iter_documents(
+                job["source_path"],
+                job["source_format"],
+                self.max_document_chars,
+                progress,
+            )
+        return iter_list_documents(job["knowledge"], progress)
+
+    def discard_source(self, job: dict):
+        """
+        工作結束 (完成或放棄重試) 後刪除上傳的暫存檔
+        """
+        if job.get("source_path"):
+            try:
+                os.remove(job["source_path"])
+            except FileNotFoundError:
+                pass
+
+    def run_job(self, job: dict) -> dict:
+        """
+        執行佇列中的一個工作，從上次已寫入的 chunk 位置繼續
+
+        文件只讀取、切割一次：執行中以已讀取的位元組數回報進度，完成後才寫入總 chunk 數。
+        """
+        job_id = job["job_id"]
+        progress = ReadProgress()
+        base_inserted = job["inserted"]
+        base_skipped = job["skipped_duplicates"]
+
+        def on_commit(stats: dict):
+            self.ingestion_queue.commit_progress(
+                job_id,
+                job["lease_owner"],
+                stats["committed_chunks"],
+                base_inserted + stats["inserted"],
+                base_skipped + stats["skipped_duplicates"],
+                stats["stages"],
+                progress.bytes_read,
+            )
 
-    def execute(self, knowledge_list: List[str]):
-        self.vector_db.insert_vectors(knowledge_list, self.embedding_model)
+        stats = self.vector_db.insert_vectors(
+            self._documents(job, progress),
+            self.embedding_model,
+            skip_chunks=job["committed_chunks"],
+            on_commit=on_commit,
+            namespace=job["namespace"],
+            chunker=self.chunker,
+        )
+        self.ingestion_queue.set_total(
+            job_id, job["lease_owner"], stats["committed_chunks"]
+        )
+        return stats
@@ -0,0 +1,80 @@
+import json
+import re
+
+
+class JsonStringFieldStreamDecoder:
+    """
+    從串流中的 JSON 片段逐步解出指定字串欄位的內容
+
+    例如模型逐段輸出 {"content": "# 標題\\n內容..."} 時，
+    每次 feed() 只回傳 content 欄位新解碼出來的文字。
+    """
+
+    _escapes = {
+        '"': '"',
+        "\\": "\\",
+        "/": "/",
+        "b": "\b",
+        "f": "\f",
+        "n": "\n",
+        "r": "\r",
+        "t": "\t",
+    }
+
+    def __init__(self, field: str):
+        self._field_pattern = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._buffer = ""
+        self._position = None  # 欄位值在 buffer 中目前解碼到的位置
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self._done:
+            return ""
+        if self._position is None:
+            match = self._field_pattern.search(self._buffer)
+            if not match:
+                return ""
+            self._position = match.end()
+
+        decoded = []
+        buffer = self._buffer
+        i = self._position
+        while i < len(buffer):
+            ch = buffer[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch != "\\":
+                decoded.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buffer):
+                break  # 跳脫字元不完整，等待下一段
+            escape = buffer[i + 1]
+            if escape != "u":
+                decoded.append(self._escapes.get(escape, escape))
+                i += 2
+                continue
+            if i + 6 > len(buffer):
+                break
+            code = int(buffer[i + 2 : i + 6], 16)
+            if 0xD800 <= code <= 0xDBFF:
+                # surrogate pair 需要連同下一個 \\uXXXX 一起解碼
+                if i + 12 > len(buffer):
+                    break
+                decoded.append(json.loads(f'"{buffer[i : i + 12]}"'))
+                i += 12
+            else:
+                decoded.append(chr(code))
+                i += 6
+        self._position = i
+        return "".join(decoded)
+
+    @property
+    def text(self) -> str:
+        """
+        目前累積的完整原始輸出
+        """
+        return self._buffer
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from domain.services.api_request_service import APIRequest
+from infrastructure.metrics.metrics import get_metrics_registry
+from infrastructure.queue.outbox import Outbox
+
+
+class OutboxDispatcher:
+    """
+    在背景將 outbox 中的請求送往 Web API
+
+    - 每次取出最多 batch_size 筆，以 concurrency 限制同時傳送的數量
+    - 同一批中對同一資源的多筆 PUT 只送最新的一筆 (PUT 為整筆覆寫)
+    - 每筆請求帶上 Idempotency-Key，失敗時以指數退避重送；4xx (408 / 429 除外) 不重送
+    - 送出 max_attempts 次仍失敗的訊息標記為 failed，保留在 outbox 中供人工處理
+
+    在 event loop 中執行，多個 worker 行程可共用同一個 outbox。
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        api_request_service: APIRequest,
+        batch_size: int = 20,
+        concurrency: int = 4,
+        poll_interval: float = 5.0,
+        max_attempts: int = 8,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        retention_seconds: float = 86400.0,
+    ):
+        self.outbox = outbox
+        self.api_request_service = api_request_service
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention_seconds = retention_seconds
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_purge = 0.0
+
+        metrics = get_metrics_registry()
+        self.deliveries_total = metrics.counter(
+            "outbox_deliveries_total", "Web API outbox delivery outcomes", ("outcome",)
+        )
+        self.delivery_delay = metrics.histogram(
+            "outbox_delivery_delay_seconds",
+            "Time from enqueue to successful delivery to the web API",
+        )
+
+    async def enqueue_async(self, method: str, endpoint: str, payload: dict) -> str:
+        """
+        將請求寫入 outbox 後立即返回，由背景 dispatcher 傳送
+        """
+        message_id = await asyncio.to_thread(
+            self.outbox.enqueue, method, endpoint, payload
+        )
+        self.notify()
+        return message_id
+
+    def start(self):
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        停止前會送完目前這一批，尚未送出的訊息留在 outbox，下次啟動時繼續
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self.notify()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            pass  # wait_for 已取消 task，租約到期後由其他 worker 或下次啟動接手
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                batch = await asyncio.to_thread(
+                    self.outbox.claim_batch, self.batch_size
+                )
+                if batch:
+                    await self._deliver_batch(batch)
+                    continue
+                await self._purge()
+                due = await asyncio.to_thread(self.outbox.next_due_in)
+            except Exception as e:
+                print(f"[OutboxDispatcher] Error: {e}")
+                due = None
+            timeout = (
+                self.poll_interval if due is None else min(due, self.poll_interval)
+            )
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _purge(self):
+        if time.time() - self._last_purge < 3600:
+            return
+        self._last_purge = time.time()
+        purged = await asyncio.to_thread(
+            self.outbox.purge_delivered, self.retention_seconds
+        )
+        if purged:
+            print(f"[OutboxDispatcher] Purged {purged} delivered message(s)")
+
+    async def _deliver_batch(self, batch: List[dict]):
+        to_send, latest_put, superseded = [], {}, []
+        for message in batch:  # 依建立時間排序
+            if message["method"] != "PUT":
+                to_send.append(message)
+                continue
+            previous = latest_put.get(message["endpoint"])
+            if previous is not None:
+                superseded.append(previous["message_id"])
+            latest_put[message["endpoint"]] = message
+        to_send.extend(latest_put.values())
+        if superseded:
+            await asyncio.to_thread(
+                self.outbox.mark_delivered, superseded, "superseded"
+            )
+            self.deliveries_total.inc(len(superseded), outcome="superseded")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(message: dict) -> Optional[str]:
+            async with semaphore:
+                return await self._deliver(message)
+
+        results = await asyncio.gather(*(deliver(m) for m in to_send))
+        delivered = [message_id for message_id in results if message_id]
+        if delivered:
+            await asyncio.to_thread(self.outbox.mark_delivered, delivered)
+
+    async def _deliver(self, message: dict) -> Optional[str]:
+        """
+        傳送成功時回傳 message_id，失敗時安排重送或標記為 failed
+        """
+        message_id = message["message_id"]
+        try:
+            await self.api_request_service.execute_async(
+                message["method"],
+                endpoint=message["endpoint"],
+                payload=message["payload"],
+                headers={"Idempotency-Key": message_id},
+            )
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)  # 連線錯誤等皆可重送
+            if not retryable or message["attempts"] >= self.max_attempts:
+                print(
+                    f"[OutboxDispatcher] {message['method']} {message['endpoint']} "
+                    f"failed permanently: {e}"
+                )
+                self.deliveries_total.inc(outcome="failed")
+                await asyncio.to_thread(self.outbox.mark_failed, message_id, str(e))
+            else:
+                delay = min(
+                    self.base_backoff * (2 ** (message["attempts"] - 1)),
+                    self.max_backoff,
+                )
+                self.deliveries_total.inc(outcome="retry")
+                await asyncio.to_thread(
+                    self.outbox.retry_later, message_id, str(e), delay
+                )
+            return None
+        self.deliveries_total.inc(outcome="delivered")
+        self.delivery_delay.observe(time.time() - message["created_at"])
+        return message_id
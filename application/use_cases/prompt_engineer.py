@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Optional
+
+from application.use_cases.rag_context_builder import RagContext, RagContextBuilder
 
 
 class PromptEngineer:
@@ -6,34 +8,23 @@ class PromptEngineer:
     提示詞工程與上下文整理
     """
 
-    def __init__(self):
-        pass
-
-    def build_rag_vector_prompt(
-        self, results: List[tuple], threshold: float = 0.35
-    ) -> str:
-        """
-        將向量資料庫檢索結果整理成 prompt
+    def __init__(self, context_builder: Optional[RagContextBuilder] = None):
+        self.context_builder = context_builder or RagContextBuilder()
 
-        Args:
-            results: list of tuples -> (id, score, metadata)
+    def build_rag_context(
+        self,
+        vector_results: List[tuple],
+        google_results: List[dict],
+        token_budget: Optional[int] = None,
+    ) -> RagContext:
         """
-        context_text = ""
-        for result in results:
-            # result[2] 是 metadata dict
-            if result[1] < threshold:
-                context_text += f"{result[2]['text']}\n"
-        if not context_text:
-            context_text = "無相關知識"
-        return context_text
+        合併重疊 chunk、去除兩個來源間的近似重複後，依分數在 token 預算內組合上下文
 
-    def build_rag_google_search_prompt(self, results: List[dict]) -> str:
-        """
-        將 Google 搜尋結果整理成 prompt
-        Args:
-            results: list of dict -> {'title':..., 'snippet':...}
+        Returns:
+            RagContext: vector_text (text1)、google_text (text2) 與節省的 token 統計
         """
-        prompt = ""
-        for result in results:
-            prompt += f"Title: {result['title']}\nSnippet: {result['snippet']}\n\n"
-        return prompt
+        context = self.context_builder.build(
+            vector_results, google_results, token_budget=token_budget
+        )
+        print(f"[PromptEngineer] RAG context: {context.report}")
+        return context
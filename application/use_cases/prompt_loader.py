@@ -1,17 +1,129 @@
+import os
+import threading
+import time
 from pathlib import Path
+from string import Formatter
+from typing import Iterable, Optional
 
 prompt_location = Path("template/prompt")
 
 
+class PromptTemplate:
+    """
+    已載入並解析過 placeholder 的提示詞模板
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with open(path, "r", encoding="utf-8") as file:
+            self.text = file.read()
+        self.placeholders = frozenset(
+            field_name
+            for _, field_name, _, _ in Formatter().parse(self.text)
+            if field_name is not None
+        )
+
+
+class PromptRegistry:
+    """
+    行程共用的提示詞模板登錄表
+
+    啟動時一次載入 template/prompt 下的所有模板，之後只在檔案 mtime 改變時重新載入
+    (每個模板最多每 reload_interval 秒檢查一次)。
+    use case 以 require() 宣告需要的 placeholder，名稱不符時在啟動時就拋出錯誤。
+    """
+
+    def __init__(self, location: Path = prompt_location, reload_interval: float = 2.0):
+        self.location = location
+        self.reload_interval = reload_interval
+        self._templates: dict = {}
+        self._required: dict = {}
+        self._last_checked: dict = {}
+        self._lock = threading.Lock()
+        for path in sorted(location.iterdir()):
+            if path.is_file():
+                self._templates[path.name] = PromptTemplate(path)
+                self._last_checked[path.name] = time.monotonic()
+
+    @staticmethod
+    def _validate(name: str, template: PromptTemplate, required: frozenset):
+        if template.placeholders != required:
+            missing = sorted(required - template.placeholders)
+            unknown = sorted(template.placeholders - required)
+            raise ValueError(
+                f"Prompt template {name} placeholders mismatch: "
+                f"missing={missing}, unknown={unknown}"
+            )
+
+    def ensure_exists(self, name: str):
+        if name not in self._templates:
+            raise FileNotFoundError(
+                f"Prompt template {name} not found in {self.location}"
+            )
+
+    def require(self, name: str, placeholders: Iterable[str]):
+        self.ensure_exists(name)
+        required = frozenset(placeholders)
+        self._validate(name, self._templates[name], required)
+        with self._lock:
+            self._required[name] = required
+
+    def _reload_if_changed(self, name: str):
+        now = time.monotonic()
+        if now - self._last_checked[name] < self.reload_interval:
+            return
+        self._last_checked[name] = now
+        current = self._templates[name]
+        try:
+            if os.stat(current.path).st_mtime_ns == current.mtime:
+                return
+            template = PromptTemplate(current.path)
+            if name in self._required:
+                self._validate(name, template, self._required[name])
+        except Exception as e:
+            # 修改後的模板有誤時保留舊版本，避免影響線上請求
+            print(f"[PromptRegistry] Error reloading {name}: {e}")
+            return
+        with self._lock:
+            self._templates[name] = template
+        print(f"[PromptRegistry] Reloaded {name}")
+
+    def get(self, name: str) -> str:
+        self._reload_if_changed(name)
+        return self._templates[name].text
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+    return _registry
+
+
 class PromptLoader:
     """
     讀取提示詞模板
     """
 
-    def __init__(self, file_name: str):
-        self.file_name = prompt_location / file_name
+    def __init__(
+        self,
+        file_name: str,
+        placeholders: Optional[Iterable[str]] = None,
+        registry: Optional[PromptRegistry] = None,
+    ):
+        self.file_name = file_name
+        self.registry = registry or get_prompt_registry()
+        if placeholders is not None:
+            self.registry.require(file_name, placeholders)
+        else:
+            self.registry.ensure_exists(file_name)
 
     def load_prompt(self) -> str:
-        with open(self.file_name, "r", encoding="utf-8") as file:
-            prompt_template = file.read()
-        return prompt_template
+        return self.registry.get(self.file_name)
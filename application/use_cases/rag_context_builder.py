@@ -0,0 +1,188 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from infrastructure.metrics.metrics import current_trace, get_metrics_registry
+
+_CJK = re.compile(r"[　-〿㐀-鿿豈-﫿＀-￯]")
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗估 token 數: 中日韓文字約 1 字 1 token，其他文字約 4 字元 1 token
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class ContextPiece:
+    source: str  # "vector" 或 "google"
+    text: str
+    score: float
+    title: str = ""
+    tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = estimate_tokens(self.render())
+
+    def render(self) -> str:
+        if self.source == "google":
+            return f"Title: {self.title}\nSnippet: {self.text}\n\n"
+        return f"{self.text}\n"
+
+
+@dataclass
+class RagContext:
+    vector_text: str
+    google_text: str
+    report: dict
+
+
+class RagContextBuilder:
+    """
+    在 token 預算內組合 RAG 上下文
+
+    1. 合併向量檢索結果中彼此重疊 (切割時的 chunk_overlap) 或互相包含的 chunk
+    2. 移除向量結果與 Google 搜尋結果之間近似重複 (3-gram 覆蓋率) 的片段
+    3. 依分數排序後放入 token 預算，放不下的片段略過
+
+    report 中的 tokens_saved 為與逐筆串接相比省下的 token 數。
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        distance_threshold: float = 0.35,
+        min_overlap: int = 5,
+        max_overlap: int = 60,
+        duplicate_similarity: float = 0.8,
+        google_base_score: float = 0.7,
+    ):
+        self.token_budget = token_budget
+        self.distance_threshold = distance_threshold
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+        self.duplicate_similarity = duplicate_similarity
+        self.google_base_score = google_base_score
+        metrics = get_metrics_registry()
+        self.tokens_saved_total = metrics.counter(
+            "rag_context_tokens_saved_total",
+            "Tokens removed from RAG context by merging, dedup and budgeting",
+        )
+        self.context_tokens = metrics.histogram(
+            "rag_context_tokens",
+            "Estimated tokens of assembled RAG context",
+            buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+        )
+
+    def _overlap(self, left: str, right: str) -> int:
+        """
+        left 的結尾與 right 的開頭重疊的字元數 (至少 min_overlap 才算)
+        """
+        longest = min(len(left), len(right), self.max_overlap)
+        for size in range(longest, self.min_overlap - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def _merge_vector_chunks(self, pieces: List[ContextPiece]) -> List[ContextPiece]:
+        merged: List[list] = []  # [text, score]
+        for piece in sorted(pieces, key=lambda p: -p.score):
+            text = piece.text
+            for existing in merged:
+                if text in existing[0]:
+                    pass
+                elif existing[0] in text:
+                    existing[0] = text
+                elif size := self._overlap(existing[0], text):
+                    existing[0] = existing[0] + text[size:]
+                elif size := self._overlap(text, existing[0]):
+                    existing[0] = text + existing[0][size:]
+                else:
+                    continue
+                existing[1] = max(existing[1], piece.score)
+                break
+            else:
+                merged.append([text, piece.score])
+        return [ContextPiece("vector", text, score) for text, score in merged]
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        normalized = _NON_WORD.sub("", unicodedata.normalize("NFKC", text).lower())
+        if len(normalized) < 3:
+            return {normalized}
+        return {normalized[i : i + 3] for i in range(len(normalized) - 2)}
+
+    def _drop_near_duplicates(self, pieces: List[ContextPiece]) -> List[ContextPiece]:
+        """
+        依分數由高到低保留片段；若某片段的內容大多已出現在先前保留的片段中則捨棄
+        """
+        kept, kept_shingles = [], []
+        for piece in sorted(pieces, key=lambda p: -p.score):
+            shingles = self._shingles(piece.text)
+            duplicate = any(
+                len(shingles & other) / len(shingles) >= self.duplicate_similarity
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(piece)
+                kept_shingles.append(shingles)
+        return kept
+
+    def build(
+        self,
+        vector_results: list,
+        google_results: list,
+        token_budget: Optional[int] = None,
+    ) -> RagContext:
+        """
+        Args:
+            vector_results: list of tuples -> (id, distance, metadata)
+            google_results: list of dict -> {'title':..., 'snippet':...}
+        """
+        token_budget = token_budget or self.token_budget
+        vector_pieces = [
+            ContextPiece("vector", result[2]["text"], 1 - result[1])
+            for result in vector_results
+            if result[1] < self.distance_threshold
+        ]
+        google_pieces = [
+            ContextPiece(
+                "google",
+                result["snippet"],
+                self.google_base_score - 0.02 * rank,
+                title=result["title"],
+            )
+            for rank, result in enumerate(google_results)
+        ]
+        original_tokens = sum(p.tokens for p in vector_pieces + google_pieces)
+
+        merged = self._merge_vector_chunks(vector_pieces)
+        candidates = self._drop_near_duplicates(merged + google_pieces)
+
+        selected, used_tokens = [], 0
+        for piece in candidates:  # 已依分數由高到低排序
+            if used_tokens + piece.tokens <= token_budget:
+                selected.append(piece)
+                used_tokens += piece.tokens
+
+        vector_text = "".join(p.render() for p in selected if p.source == "vector")
+        google_text = "".join(p.render() for p in selected if p.source == "google")
+        report = {
+            "token_budget": token_budget,
+            "original_tokens": original_tokens,
+            "context_tokens": used_tokens,
+            "tokens_saved": original_tokens - used_tokens,
+            "merged_chunks": len(vector_pieces) - len(merged),
+            "duplicates_dropped": len(merged) + len(google_pieces) - len(candidates),
+            "over_budget_dropped": len(candidates) - len(selected),
+        }
+        self.tokens_saved_total.inc(report["tokens_saved"])
+        self.context_tokens.observe(used_tokens)
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["rag_context"] = report
+        return RagContext(vector_text or "無相關知識", google_text, report)
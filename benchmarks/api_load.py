@@ -0,0 +1,263 @@
+"""
+以替身服務在行程內壓測各 API 路由
+
+不需要 Gemini、Google 搜尋、Supabase 或 Web API，所有外部服務皆由 benchmarks/fakes.py 取代，
+延遲與失敗率可由參數調整。每個路由回報 p50/p95/p99 延遲、每秒請求數與記憶體用量，
+輸出為 JSON，可存檔後比較不同 commit 的結果。
+
+用法:
+    uv run python -m benchmarks.api_load --requests 500 --concurrency 50
+    uv run python -m benchmarks.api_load --routes generate_course --gemini-ms 800 --output before.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fakes import (
+    FakeAPIRequest,
+    FakeGeminiClient,
+    FakeGoogleSearch,
+    FakeVectorDB,
+    LatencyProfile,
+)
+from benchmarks.stats import rss_mb, summarize
+
+SCENARIOS = {
+    "health": lambda i: ("GET", "/health", None),
+    "generate_questions": lambda i: (
+        "GET",
+        f"/ai/generate_questions/{i}/如何學習 Python 第 {i % 50} 課",
+        None,
+    ),
+    "generate_course": lambda i: (
+        "POST",
+        "/ai/generate_course",
+        {
+            "user_id": i,
+            "user_answer": [
+                {"question_text": "你的程度?", "option": "初學者"},
+                {"question_text": "想學習的方向?", "option": "資料分析"},
+            ],
+        },
+    ),
+    "generate_chapter_content": lambda i: (
+        "POST",
+        "/ai/generate_chapter_content",
+        {
+            "course_name": "Python 入門",
+            "intro": "從零開始學習 Python",
+            "section_name": "基礎語法",
+            "chapter_id": i,
+            "chapter_name": f"第 {i % 20} 章",
+        },
+    ),
+    "generate_chapter_content_stream": lambda i: (
+        "POST",
+        "/ai/generate_chapter_content/stream",
+        {
+            "course_name": "Python 入門",
+            "intro": "從零開始學習 Python",
+            "section_name": "基礎語法",
+            "chapter_id": i,
+            "chapter_name": f"第 {i % 20} 章",
+        },
+    ),
+    "insert_knowledge": lambda i: (
+        "POST",
+        "/rag/insert_knowledge",
+        {"knowledge": [{"content": f"第 {i} 份知識內容。" * 50}]},
+    ),
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_app(args, work_dir: str):
+    from domain.services.session_store import InMemorySessionStore
+    from infrastructure.queue.ingestion_queue import IngestionQueue
+    from infrastructure.queue.outbox import Outbox
+    from interfaces.api.fastapi_app import create_app
+
+    os.environ.setdefault(
+        "RESPONSE_CACHE_ENABLED", "true" if args.response_cache else "false"
+    )
+    os.environ.setdefault("JOB_TRACKER_DB_PATH", os.path.join(work_dir, "jobs.db"))
+
+    def profile(mean_ms: float) -> LatencyProfile:
+        return LatencyProfile(
+            mean_ms=mean_ms,
+            jitter_ms=mean_ms * args.jitter,
+            failure_rate=args.failure_rate,
+            seed=args.seed,
+        )
+
+    session_store = InMemorySessionStore(ttl=3600, max_entries=args.requests * 2)
+    for i in range(args.requests):
+        session_store.set(
+            i, {"user_question": f"如何學習 Python 第 {i % 50} 課", "questions": []}
+        )
+    app = create_app(
+        gemini_client=FakeGeminiClient(
+            LatencyProfile(
+                mean_ms=args.gemini_ms,
+                jitter_ms=args.gemini_ms * args.jitter,
+                failure_rate=args.failure_rate,
+                rate_limit_rate=args.rate_limit_rate,
+                seed=args.seed,
+            )
+        ),
+        google_search=FakeGoogleSearch(profile(args.search_ms)),
+        vector_db=FakeVectorDB(
+            query_profile=profile(args.vector_ms),
+            insert_profile=profile(args.vector_ms),
+        ),
+        api_request_service=FakeAPIRequest(profile(args.web_api_ms)),
+        session_store=session_store,
+        ingestion_queue=IngestionQueue(os.path.join(work_dir, "ingestion_queue.db")),
+        outbox=Outbox(os.path.join(work_dir, "outbox.db")),
+    )
+    return app
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, name: str, requests: int, concurrency: int
+) -> dict:
+    make_request = SCENARIOS[name]
+    latencies = []
+    status_codes = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            method, path, body = make_request(index)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            status_codes[status] = status_codes.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "route": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 2),
+        "latency": summarize(latencies),
+        "status_codes": status_codes,
+        "rss_mb": rss_mb(),
+    }
+
+
+async def run(args) -> dict:
+    baseline_rss = rss_mb()
+    with tempfile.TemporaryDirectory() as work_dir:
+        app = build_app(args, work_dir)
+        results = []
+        async with app.router.lifespan_context(app):
+            startup_rss = rss_mb()
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                for name in args.routes:
+                    results.append(
+                        await run_scenario(
+                            client, name, args.requests, args.concurrency
+                        )
+                    )
+    return {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "profile": {
+            "gemini_ms": args.gemini_ms,
+            "search_ms": args.search_ms,
+            "vector_ms": args.vector_ms,
+            "web_api_ms": args.web_api_ms,
+            "jitter": args.jitter,
+            "failure_rate": args.failure_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "response_cache": args.response_cache,
+        },
+        "memory": {
+            "baseline_rss_mb": baseline_rss,
+            "startup_rss_mb": startup_rss,
+            "final_rss_mb": rss_mb(),
+            "peak_rss_mb": rss_mb("VmHWM"),
+        },
+        "routes": results,
+    }
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """
+    替身服務的延遲、失敗率等參數 (benchmarks.serve_load 共用)
+    """
+    parser.add_argument("--gemini-ms", type=float, default=300.0)
+    parser.add_argument("--search-ms", type=float, default=150.0)
+    parser.add_argument("--vector-ms", type=float, default=20.0)
+    parser.add_argument("--web-api-ms", type=float, default=30.0)
+    parser.add_argument("--jitter", type=float, default=0.2, help="延遲的浮動比例")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Gemini 回傳 429 的機率"
+    )
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--routes", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    add_profile_arguments(parser)
+    parser.add_argument("--output", help="將結果寫入 JSON 檔")
+    parser.add_argument("--verbose", action="store_true", help="顯示服務本身的輸出")
+    args = parser.parse_args()
+
+    # 服務會 print 提示詞等除錯訊息，預設隱藏以保持輸出為純 JSON
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+比較不同 embedding backend 的載入時間、記憶體 (RSS) 與 encode 吞吐量
+
+每個 backend 在獨立的子行程中量測，避免彼此的記憶體互相影響。
+
+用法:
+    uv run python -m benchmarks.embedding_backends --backends torch onnx onnx-int8
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.stats import rss_mb
+
+
+def measure(backend: str, sentences: int, batch_size: int) -> dict:
+    from infrastructure.config import Config
+    from infrastructure.embedding.embedding_backend import EmbeddingBackend
+
+    config = Config()
+    baseline_rss = rss_mb()
+    embedding_model = EmbeddingBackend(
+        config.EMBEDDING_MODEL,
+        backend=backend,
+        quantization=config.EMBEDDING_QUANTIZATION,
+        onnx_cache_dir=config.EMBEDDING_ONNX_CACHE_DIR,
+    )
+    start = time.perf_counter()
+    embedding_model.warm_up()
+    startup_seconds = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    texts = [
+        f"第 {i} 段測試文字，用來量測向量模型的編碼速度與記憶體用量。"
+        for i in range(sentences)
+    ]
+    start = time.perf_counter()
+    embedding_model.encode(texts, batch_size=batch_size)
+    encode_seconds = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "model": config.EMBEDDING_MODEL,
+        "startup_seconds": round(startup_seconds, 3),
+        "rss_mb": loaded_rss,
+        "model_rss_mb": round(loaded_rss - baseline_rss, 1),
+        "peak_rss_mb": rss_mb(),
+        "sentences_per_second": round(sentences / encode_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.single, args.sentences, args.batch_size)))
+        return
+
+    results = []
+    for backend in args.backends:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.embedding_backends",
+                "--single",
+                backend,
+                "--sentences",
+                str(args.sentences),
+                "--batch-size",
+                str(args.batch_size),
+            ],
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            results.append(
+                {"backend": backend, "error": completed.stderr.strip()[-500:]}
+            )
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+離線基準測試用的外部服務替身
+
+FakeGeminiClient 取代 genai.Client，直接注入真正的 GeminiService，
+讓快取等服務層邏輯仍然被量測；Google 搜尋、向量資料庫與 Web API 則以相同介面的替身取代。
+每個替身都可設定延遲與失敗率 (LatencyProfile)。
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+import typing
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from infrastructure.metrics.stage_stats import StageStats
+
+
+class FakeBackendError(Exception):
+    """
+    替身依失敗率模擬出的外部服務錯誤
+    """
+
+
+class FakeRateLimitError(FakeBackendError):
+    """
+    模擬 429 配額錯誤 (與 google.genai 的錯誤相同帶有 code 屬性)
+    """
+
+    code = 429
+
+
+@dataclass
+class LatencyProfile:
+    """
+    模擬外部服務的延遲與失敗
+
+    每次呼叫的延遲為 mean_ms ± jitter_ms (均勻分布)，並有 failure_rate 的機率拋出 FakeBackendError、
+    rate_limit_rate 的機率拋出 FakeRateLimitError。
+    """
+
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def delay(self) -> float:
+        jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(self.mean_ms + jitter, 0.0) / 1000
+
+    def _check_failure(self, name: str):
+        if self.rate_limit_rate and self._rng.random() < self.rate_limit_rate:
+            raise FakeRateLimitError(f"Simulated {name} 429 RESOURCE_EXHAUSTED")
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise FakeBackendError(f"Simulated {name} failure")
+
+    def wait(self, name: str):
+        time.sleep(self.delay())
+        self._check_failure(name)
+
+    async def wait_async(self, name: str):
+        await asyncio.sleep(self.delay())
+        self._check_failure(name)
+
+
+def sample_for_schema(schema):
+    """
+    依 pydantic 模型的欄位型別產生一份符合結構的範例資料
+    """
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return {
+            name: sample_for_schema(info.annotation)
+            for name, info in schema.model_fields.items()
+        }
+    origin = typing.get_origin(schema)
+    if origin in (list, typing.List):
+        (item_type,) = typing.get_args(schema)
+        return [sample_for_schema(item_type) for _ in range(3)]
+    if schema is int:
+        return 1
+    if schema is float:
+        return 1.0
+    if schema is bool:
+        return True
+    return "範例內容"
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self.owner = owner
+
+    def generate_content(self, model: str, contents: str, config=None):
+        self.owner.profile.wait("Gemini")
+        return self.owner.response(model, contents, config)
+
+
+class _FakeAsyncModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self.owner = owner
+
+    async def generate_content(self, model: str, contents: str, config=None):
+        await self.owner.profile.wait_async("Gemini")
+        return self.owner.response(model, contents, config)
+
+    async def generate_content_stream(self, model: str, contents: str, config=None):
+        owner = self.owner
+        await owner.profile.wait_async("Gemini")
+        text = owner.response(model, contents, config).text
+        step = max(len(text) // owner.stream_chunks, 1)
+
+        async def stream():
+            for start in range(0, len(text), step):
+                await asyncio.sleep(owner.stream_interval_ms / 1000)
+                yield SimpleNamespace(text=text[start : start + step])
+
+        return stream()
+
+
+class FakeGeminiClient:
+    """
+    genai.Client 的替身，依 config.response_schema 回傳符合結構的 JSON
+    """
+
+    def __init__(
+        self,
+        profile: Optional[LatencyProfile] = None,
+        stream_chunks: int = 20,
+        stream_interval_ms: float = 5.0,
+    ):
+        self.profile = profile or LatencyProfile()
+        self.stream_chunks = stream_chunks
+        self.stream_interval_ms = stream_interval_ms
+        self.calls = 0
+        self.models = _FakeModels(self)
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self))
+
+    def response(self, model: str, contents: str, config=None):
+        self.calls += 1
+        schema = getattr(config, "response_schema", None) if config else None
+        if schema is not None:
+            text = json.dumps(sample_for_schema(schema), ensure_ascii=False)
+        else:
+            text = f"search query {hashlib.sha1(contents.encode()).hexdigest()[:8]}"
+        usage = SimpleNamespace(
+            prompt_token_count=len(contents) // 2,
+            candidates_token_count=len(text) // 2,
+            total_token_count=(len(contents) + len(text)) // 2,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeGoogleSearch:
+    """
+    GoogleSearch 的替身
+    """
+
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+
+    @staticmethod
+    def _results(query: str, max_results: int) -> list:
+        return [
+            {"title": f"{query} 結果 {i + 1}", "snippet": f"{query} 的相關說明 {i + 1}"}
+            for i in range(max_results)
+        ]
+
+    def search(self, query: str, max_results=5) -> list:
+        self.profile.wait("Google Search")
+        return self._results(query, max_results)
+
+    async def search_async(self, query: str, max_results=5) -> list:
+        await self.profile.wait_async("Google Search")
+        return self._results(query, max_results)
+
+
+class FakeVectorDB:
+    """
+    VectorDB 的替身，不需要 pgvector 與 embedding 模型
+
+    以簡單的固定長度切割模擬 chunk，insert_vectors 的回傳格式與進度回報與 VectorDB 相同。
+    """
+
+    def __init__(
+        self,
+        query_profile: Optional[LatencyProfile] = None,
+        insert_profile: Optional[LatencyProfile] = None,
+        chunk_size: int = 100,
+        upsert_batch_size: int = 500,
+    ):
+        self.query_profile = query_profile or LatencyProfile()
+        self.insert_profile = insert_profile or LatencyProfile()
+        self.chunk_size = chunk_size
+        self.upsert_batch_size = upsert_batch_size
+        self.embedding_model = None
+        self.local_index = None
+        self.rows = {}  # (namespace, chunk id) -> chunk
+
+    def iter_chunks(self, knowledge: Iterable[str]) -> Iterator[str]:
+        for text in knowledge:
+            for start in range(0, len(text), self.chunk_size):
+                yield text[start : start + self.chunk_size]
+
+    def load_local_index(
+        self,
+        max_rows: Optional[int] = None,
+        batch_size=1000,
+        namespace: Optional[str] = None,
+    ):
+        pass
+
+    def insert_vectors(
+        self,
+        knowledge: Iterable[str],
+        embedding_model=None,
+        skip_chunks: int = 0,
+        on_commit: Optional[Callable[[dict], None]] = None,
+        namespace: Optional[str] = None,
+        chunker=None,
+    ) -> dict:
+        start = time.perf_counter()
+        stage_stats = StageStats()
+        if chunker is not None:
+            chunks = chunker.iter_chunks(knowledge, stage_stats)
+        else:
+            chunks = stage_stats.timed("chunk", self.iter_chunks(knowledge))
+        chunks = list(chunks)[skip_chunks:]
+        inserted = skipped = 0
+        for offset in range(0, len(chunks), self.upsert_batch_size):
+            with stage_stats.measure("upsert") as stage:
+                self.insert_profile.wait("vector upsert")
+                stage.items = min(self.upsert_batch_size, len(chunks) - offset)
+            for chunk in chunks[offset : offset + self.upsert_batch_size]:
+                chunk_id = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+                if (namespace, chunk_id) in self.rows:
+                    skipped += 1
+                else:
+                    self.rows[(namespace, chunk_id)] = chunk
+                    inserted += 1
+        elapsed = time.perf_counter() - start
+        stats = {
+            "chunks": len(chunks),
+            "committed_chunks": skip_chunks + len(chunks),
+            "inserted": inserted,
+            "skipped_duplicates": skipped,
+            "embedding_cache_hits": 0,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(chunks) / elapsed, 2) if elapsed else 0.0,
+            "stages": stage_stats.to_dict(),
+        }
+        if on_commit:
+            on_commit(stats)
+        return stats
+
+    def query(self, prompt, search_limit=10, namespace: Optional[str] = None) -> list:
+        self.query_profile.wait("vector query")
+        return [
+            (f"chunk-{i}", 0.1 + i * 0.02, {"text": f"{prompt} 相關知識 {i + 1}"})
+            for i in range(search_limit)
+        ]
+
+
+class FakeAPIRequest:
+    """
+    APIRequest (Web API) 的替身，記錄收到的請求數量
+    """
+
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+        self.requests = 0
+
+    def check_health(self) -> bool:
+        return True
+
+    def execute(
+        self, method: str, endpoint: str, payload: dict, headers: dict = None
+    ) -> dict:
+        self.profile.wait("Web API")
+        self.requests += 1
+        return {"status": "ok"}
+
+    async def execute_async(
+        self, method: str, endpoint: str, payload: dict, headers: dict = None
+    ) -> dict:
+        await self.profile.wait_async("Web API")
+        self.requests += 1
+        return {"status": "ok"}
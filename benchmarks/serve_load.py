@@ -0,0 +1,195 @@
+"""
+比較不同 worker 數量 (prefork 模式) 的吞吐量與每個 worker 的記憶體用量
+
+與 benchmarks.api_load 不同，請求經由真正的 TCP 連線送到獨立的伺服器行程。
+
+用法:
+    # 自動以替身服務分別啟動 1 與 4 個 worker 並比較
+    uv run python -m benchmarks.serve_load compare --workers 1 4 --routes generate_chapter_content
+
+    # 量測正式服務 (含預先載入的 embedding 模型): 先以 WEB_CONCURRENCY=4 uv run python main.py 啟動，
+    # 再以主行程 pid 量測，worker 行程會自動找出
+    uv run python -m benchmarks.serve_load measure --url http://127.0.0.1:8081 --pid <主行程 pid> --routes health
+
+    # 只啟動以替身服務運作的 prefork 伺服器
+    uv run python -m benchmarks.serve_load serve --workers 4 --port 8090
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.api_load import (
+    SCENARIOS,
+    add_profile_arguments,
+    build_app,
+    git_revision,
+    run_scenario,
+)
+from benchmarks.stats import child_pids, process_memory_mb
+
+
+def serve(args):
+    from interfaces.api.prefork_server import serve_prefork
+
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        serve_prefork(
+            lambda: build_app(args, work_dir),
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+        )
+
+
+def memory_report(pid: int) -> dict:
+    workers = [{"pid": child, **process_memory_mb(child)} for child in child_pids(pid)]
+    master = {"pid": pid, **process_memory_mb(pid)}
+    processes = [master] + workers
+    return {
+        "master": master,
+        "workers": workers,
+        "total_rss_mb": round(sum(p["rss"] for p in processes), 1),
+        # rss 加總會重複計算共用分頁，pss 加總才是實際使用的記憶體
+        "total_pss_mb": round(sum(p["pss"] for p in processes), 1),
+    }
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server at {url} did not become ready")
+            await asyncio.sleep(0.2)
+
+
+async def measure(args, pid: int) -> dict:
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    routes = []
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=None, limits=limits
+    ) as client:
+        for name in args.routes:
+            result = await run_scenario(client, name, args.requests, args.concurrency)
+            result.pop("rss_mb")  # 壓測端的記憶體，與伺服器無關
+            routes.append(result)
+    return {"memory": memory_report(pid), "routes": routes}
+
+
+async def compare(args) -> list:
+    results = []
+    for workers in args.workers:
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.serve_load",
+            "serve",
+            "--workers",
+            str(workers),
+            "--port",
+            str(args.port),
+            *args.profile_args,
+        ]
+        server = subprocess.Popen(command)
+        try:
+            await wait_until_ready(args.url)
+            idle_memory = memory_report(server.pid)
+            result = await measure(args, server.pid)
+            results.append({"workers": workers, "idle_memory": idle_memory, **result})
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    return results
+
+
+def profile_argv(args) -> list:
+    """
+    compare 模式將替身服務的參數原樣傳給 serve 子行程
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    add_profile_arguments(parser)
+    argv = []
+    for action in parser._actions:
+        value = getattr(args, action.dest)
+        if isinstance(value, bool):
+            if value:
+                argv.append(action.option_strings[0])
+        else:
+            argv += [action.option_strings[0], str(value)]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="以替身服務啟動 prefork 伺服器")
+    serve_parser.add_argument("--workers", type=int, default=1)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8090)
+    serve_parser.add_argument(
+        "--requests", type=int, default=1000, help="預先建立的 session 數量"
+    )
+    serve_parser.add_argument("--verbose", action="store_true")
+    add_profile_arguments(serve_parser)
+
+    for name in ("measure", "compare"):
+        command = commands.add_parser(name)
+        command.add_argument(
+            "--routes", nargs="+", choices=list(SCENARIOS), default=["health"]
+        )
+        command.add_argument("--requests", type=int, default=500)
+        command.add_argument("--concurrency", type=int, default=50)
+        command.add_argument("--output", help="將結果寫入 JSON 檔")
+        if name == "measure":
+            command.add_argument("--url", default="http://127.0.0.1:8081")
+            command.add_argument("--pid", type=int, required=True, help="主行程 pid")
+        else:
+            command.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+            command.add_argument("--port", type=int, default=8090)
+            add_profile_arguments(command)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+    if args.command == "measure":
+        report = {"revision": git_revision(), **asyncio.run(measure(args, args.pid))}
+    else:
+        args.url = f"http://127.0.0.1:{args.port}"
+        args.profile_args = profile_argv(args)
+        report = {
+            "revision": git_revision(),
+            "cpu_count": os.cpu_count(),
+            "results": asyncio.run(compare(args)),
+        }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import statistics
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: list) -> dict:
+    return {
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def rss_mb(field: str = "VmRSS") -> float:
+    """
+    目前行程的記憶體用量 (MB)，field 為 VmHWM 時為峰值
+    """
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+def process_memory_mb(pid: int) -> dict:
+    """
+    指定行程的記憶體用量 (MB)
+
+    rss: 行程可存取的全部實體記憶體，與其他行程共用的分頁會重複計算
+    pss: 共用分頁依共用行程數平均分攤，各行程加總即為實際使用量
+    uss: 行程獨占的分頁
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": round(fields.get("Rss", 0) / 1024, 1),
+        "pss": round(fields.get("Pss", 0) / 1024, 1),
+        "uss": round(
+            (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1
+        ),
+    }
+
+
+def child_pids(pid: int) -> list:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # comm 可能包含空白，ppid 為右括號後的第二個欄位
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
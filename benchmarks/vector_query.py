@@ -0,0 +1,76 @@
+"""
+比較 pgvector 與行程內索引的查詢延遲
+
+用法:
+    uv run python -m benchmarks.vector_query --queries 200 --limit 10
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.stats import summarize
+from infrastructure.config import Config
+from infrastructure.db.local_vector_index import LocalVectorIndex
+from infrastructure.db.vector_db import VectorDB
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = Config()
+    vector_db = VectorDB(
+        config.DB_URL,
+        config.get_embedding_model(),
+        local_index=LocalVectorIndex(dimension=768),
+    )
+    load_start = time.perf_counter()
+    vector_db.load_local_index()
+    load_seconds = time.perf_counter() - load_start
+    index = vector_db.local_index
+    if len(index) == 0:
+        raise SystemExit("Collection is empty, insert knowledge first.")
+
+    # 以資料庫中既有的 chunk 文字作為查詢，先計算好 embedding 只比較檢索本身
+    rng = random.Random(args.seed)
+    texts = [metadata["text"] for metadata in index.metadata()]
+    queries = [vector_db.embed_query(rng.choice(texts)) for _ in range(args.queries)]
+
+    local_latencies, pg_latencies, overlaps = [], [], []
+    for query_embedding in queries:
+        start = time.perf_counter()
+        local_results = index.query(query_embedding, limit=args.limit)
+        local_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pg_results = vector_db.query_pgvector(query_embedding, args.limit)
+        pg_latencies.append(time.perf_counter() - start)
+
+        local_ids = {result[0] for result in local_results}
+        pg_ids = {result[0] for result in pg_results}
+        overlaps.append(len(local_ids & pg_ids) / max(len(pg_ids), 1))
+
+    print(
+        json.dumps(
+            {
+                "rows": len(index),
+                "queries": args.queries,
+                "limit": args.limit,
+                "local_index_load_seconds": round(load_seconds, 3),
+                "local": summarize(local_latencies),
+                "pgvector": summarize(pg_latencies),
+                "top_k_overlap": round(statistics.mean(overlaps), 4),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
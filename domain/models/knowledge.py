@@ -1,5 +1,8 @@
 from pydantic import BaseModel
 
+# 知識分區 (namespace) 名稱，例如課程代碼、科目或租戶；API 驗證與 VectorDB 共用
+NAMESPACE_PATTERN = r"^[A-Za-z0-9_-]{1,48}$"
+
 
 class Knowledge(BaseModel):
     content: str
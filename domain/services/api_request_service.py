@@ -1,33 +1,97 @@
-import requests
+from typing import Optional
+
+from infrastructure.http.http_client import AsyncHttpClient, HttpClient
+from infrastructure.metrics.metrics import stage
+
+
+class APIRequestError(Exception):
+    """
+    Web API 回應非 200 的錯誤，status_code 可用來判斷是否值得重送
+    """
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in (408, 429) or self.status_code >= 500
 
 
 class APIRequest:
-    def __init__(self, api_url: str):
+    def __init__(
+        self,
+        api_url: str,
+        http_client: Optional[HttpClient] = None,
+        async_http_client: Optional[AsyncHttpClient] = None,
+        check_health_on_start: bool = True,
+    ):
         self.api_url = api_url
-        if not self.check_health():
-            raise Exception(f"API at {api_url} is not reachable.")
+        self.http_client = http_client or HttpClient()
+        self.async_http_client = async_http_client or AsyncHttpClient()
+        # 啟動時無法連線只記錄警告，送往 Web API 的資料會留在 outbox 等待重送
+        if check_health_on_start and not self.check_health():
+            print(f"[APIRequest] Warning: API at {api_url} is not reachable.")
 
     def check_health(self) -> bool:
         health_endpoint = f"{self.api_url}/health"
-        response = requests.get(health_endpoint)
+        try:
+            response = self.http_client.get(health_endpoint)
+        except Exception as e:
+            print(f"[APIRequest] Health check failed: {e}")
+            return False
         return response.status_code == 200
 
-    def execute(self, method: str, endpoint: str, payload: dict) -> dict:
-        api_url = f"{self.api_url}/{endpoint}"
-        if method == "POST":
-            response = requests.post(api_url, json=payload)
-        elif method == "GET":
-            response = requests.get(api_url, params=payload)
-        elif method == "PUT":
-            response = requests.put(api_url, json=payload)
-        elif method == "DELETE":
-            response = requests.delete(api_url, json=payload)
-        else:
-            raise Exception(f"Unsupported HTTP method: {method}")
-
+    @staticmethod
+    def _handle_response(response) -> dict:
         if response.status_code == 200:
             return response.json()
         else:
-            raise Exception(
-                f"API request failed with status code {response.status_code}: {response.text}"
+            raise APIRequestError(
+                f"API request failed with status code {response.status_code}: {response.text}",
+                response.status_code,
             )
+
+    def execute(
+        self,
+        method: str,
+        endpoint: str,
+        payload: dict,
+        headers: Optional[dict] = None,
+    ) -> dict:
+        api_url = f"{self.api_url}/{endpoint}"
+        with stage(f"web_api_{method.lower()}"):
+            if method == "GET":
+                response = self.http_client.request(
+                    method, api_url, params=payload, headers=headers
+                )
+            elif method in ("POST", "PUT", "DELETE"):
+                response = self.http_client.request(
+                    method, api_url, json=payload, headers=headers
+                )
+            else:
+                raise Exception(f"Unsupported HTTP method: {method}")
+
+            return self._handle_response(response)
+
+    async def execute_async(
+        self,
+        method: str,
+        endpoint: str,
+        payload: dict,
+        headers: Optional[dict] = None,
+    ) -> dict:
+        api_url = f"{self.api_url}/{endpoint}"
+        with stage(f"web_api_{method.lower()}"):
+            if method == "GET":
+                response = await self.async_http_client.request(
+                    method, api_url, params=payload, headers=headers
+                )
+            elif method in ("POST", "PUT", "DELETE"):
+                response = await self.async_http_client.request(
+                    method, api_url, json=payload, headers=headers
+                )
+            else:
+                raise Exception(f"Unsupported HTTP method: {method}")
+
+            return self._handle_response(response)
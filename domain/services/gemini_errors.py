@@ -0,0 +1,29 @@
+from typing import Optional
+
+
+class GeminiServiceError(Exception):
+    """
+    Gemini 呼叫失敗 (非配額限制造成的錯誤)
+    """
+
+
+class GeminiOverloadedError(GeminiServiceError):
+    """
+    Gemini 配額不足或排隊過久，請稍後再試
+
+    retry_after 為建議的重試秒數 (可能為 None)。
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    判斷是否為 Gemini 的 429 / RESOURCE_EXHAUSTED 錯誤
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return True
+    return "RESOURCE_EXHAUSTED" in str(error)
@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from domain.services.gemini_errors import GeminiOverloadedError
+from infrastructure.metrics.metrics import get_metrics_registry
+
+PRIORITY_INTERACTIVE = 0  # 使用者正在等待的請求，例如生成問題
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2  # 背景批次工作，例如整門課程的章節生成
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BULK: "bulk",
+}
+
+
+class TokenBucket:
+    """
+    以每分鐘配額計算的 token bucket，rate_per_minute <= 0 表示不限制
+
+    settle() 可在取得實際用量後補扣或退還，餘額可以暫時為負 (下一次取用需等待補足)。
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        self.level = min(
+            self.capacity,
+            self.level + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def settle(self, delta: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level - delta)
+
+
+class _ModelState:
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.backoff = 0.0
+        self.queue: List[tuple] = []
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+
+class _Waiter:
+    def __init__(self, model: str, tokens: int, priority: int):
+        self.model = model
+        self.tokens = tokens
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future: Future = Future()
+
+
+class GeminiScheduler:
+    """
+    Gemini 呼叫的集中排程器
+
+    - 每個模型各有 RPM / TPM token bucket，額度不足時排隊等待
+    - 同一模型的等待中請求依優先順序 (PRIORITY_*) 放行，互動式請求優先於批次工作
+    - 收到 429 時暫停該模型並以指數退避延長暫停時間，成功後逐步縮短
+    - 排隊超過 max_wait 秒或佇列已滿時拋出 GeminiOverloadedError
+
+    由單一背景執行緒負責放行，同步與 async 呼叫共用同一組配額與佇列。
+    """
+
+    def __init__(
+        self,
+        default_rpm: float = 0,
+        default_tpm: float = 0,
+        model_limits: Optional[Dict[str, dict]] = None,
+        max_queue: int = 1000,
+        max_wait: float = 60.0,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.model_limits = model_limits or {}
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._models: Dict[str, _ModelState] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+
+        metrics = get_metrics_registry()
+        self.wait_seconds = metrics.histogram(
+            "gemini_scheduler_wait_seconds",
+            "Time spent queued before a Gemini call was admitted",
+            ("model", "priority"),
+        )
+        self.rejected_total = metrics.counter(
+            "gemini_scheduler_rejected_total",
+            "Gemini calls rejected because the queue was full or the wait timed out",
+            ("model", "reason"),
+        )
+        self.rate_limited_total = metrics.counter(
+            "gemini_rate_limited_total",
+            "429 responses received from Gemini",
+            ("model",),
+        )
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            limits = self.model_limits.get(model, {})
+            state = self._models[model] = _ModelState(
+                limits.get("rpm", self.default_rpm), limits.get("tpm", self.default_tpm)
+            )
+        return state
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name="gemini-scheduler", daemon=True
+            )
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while True:
+                next_wake = None
+                now = time.monotonic()
+                for model, state in self._models.items():
+                    while state.queue:
+                        waiter = state.queue[0][2]
+                        if waiter.future.cancelled():
+                            heapq.heappop(state.queue)
+                            continue
+                        wait = state.wait_time(waiter.tokens, now)
+                        if wait > 0:
+                            next_wake = (
+                                wait if next_wake is None else min(next_wake, wait)
+                            )
+                            break
+                        heapq.heappop(state.queue)
+                        if not waiter.future.set_running_or_notify_cancel():
+                            continue
+                        state.requests.take(1)
+                        state.tokens.take(waiter.tokens)
+                        self.wait_seconds.observe(
+                            now - waiter.enqueued_at,
+                            model=model,
+                            priority=PRIORITY_NAMES.get(
+                                waiter.priority, waiter.priority
+                            ),
+                        )
+                        waiter.future.set_result(None)
+                self._condition.wait(timeout=next_wake)
+
+    def _enqueue(self, model: str, tokens: int, priority: int) -> _Waiter:
+        waiter = _Waiter(model, tokens, priority)
+        with self._condition:
+            state = self._state(model)
+            if len(state.queue) >= self.max_queue:
+                self.rejected_total.inc(model=model, reason="queue_full")
+                raise GeminiOverloadedError(
+                    f"Gemini queue for {model} is full", retry_after=self.base_backoff
+                )
+            heapq.heappush(state.queue, (priority, next(self._sequence), waiter))
+            self._ensure_dispatcher()
+            self._condition.notify()
+        return waiter
+
+    def _timeout(self, waiter: _Waiter):
+        if not waiter.future.cancel():
+            return  # 逾時的同時剛好被放行，照常呼叫
+        self.rejected_total.inc(model=waiter.model, reason="timeout")
+        raise GeminiOverloadedError(
+            f"Timed out after {self.max_wait}s waiting for Gemini quota ({waiter.model})",
+            retry_after=self.base_backoff,
+        )
+
+    def acquire(self, model: str, tokens: int, priority: int = PRIORITY_DEFAULT):
+        """
+        等待直到 model 有足夠的 RPM / TPM 額度 (同步版)
+        """
+        waiter = self._enqueue(model, tokens, priority)
+        try:
+            waiter.future.result(timeout=self.max_wait)
+        except FutureTimeoutError:
+            self._timeout(waiter)
+
+    async def acquire_async(
+        self, model: str, tokens: int, priority: int = PRIORITY_DEFAULT
+    ):
+        waiter = self._enqueue(model, tokens, priority)
+        try:
+            await asyncio.wait_for(
+                asyncio.wrap_future(waiter.future), timeout=self.max_wait
+            )
+        except asyncio.TimeoutError:
+            self._timeout(waiter)
+
+    def settle(self, model: str, estimated_tokens: int, actual_tokens: int):
+        """
+        以回應的實際 token 用量修正預估值
+        """
+        with self._condition:
+            self._state(model).tokens.settle(actual_tokens - estimated_tokens)
+
+    def record_success(self, model: str):
+        with self._condition:
+            state = self._state(model)
+            if state.backoff:
+                state.backoff = (
+                    state.backoff / 2 if state.backoff > self.base_backoff else 0.0
+                )
+
+    def record_rate_limited(self, model: str) -> float:
+        """
+        收到 429 時暫停 model，回傳這次的暫停秒數
+        """
+        self.rate_limited_total.inc(model=model)
+        with self._condition:
+            state = self._state(model)
+            state.backoff = min(
+                max(state.backoff * 2, self.base_backoff), self.max_backoff
+            )
+            state.paused_until = max(
+                state.paused_until, time.monotonic() + state.backoff
+            )
+            self._condition.notify()
+            return state.backoff
+
+    def stats(self) -> dict:
+        with self._condition:
+            now = time.monotonic()
+            return {
+                "queue_depth": sum(len(state.queue) for state in self._models.values()),
+                "paused_models": sum(
+                    1 for state in self._models.values() if state.paused_until > now
+                ),
+                "max_backoff_seconds": max(
+                    (state.backoff for state in self._models.values()), default=0.0
+                ),
+            }
@@ -1,12 +1,54 @@
-from typing import Optional
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
 
 from google import genai
-from google.genai.types import GenerateContentConfig, ThinkingConfig
+from pydantic import TypeAdapter
+
+from domain.services.gemini_errors import (
+    GeminiOverloadedError,
+    GeminiServiceError,
+    is_rate_limit_error,
+)
+from domain.services.gemini_scheduler import (
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+    GeminiScheduler,
+)
+from domain.services.generation_profile import (
+    PROFILE_DEFAULT,
+    PROFILE_QUESTIONS,
+    PROFILE_SEARCH_QUERY,
+    GenerationProfile,
+    ModelRouter,
+    build_profiles,
+)
+from infrastructure.cache.response_cache import SemanticResponseCache
+from infrastructure.cache.single_flight import AsyncSingleFlight, SingleFlight
+from infrastructure.metrics.metrics import (
+    SIZE_BUCKETS,
+    current_trace,
+    get_metrics_registry,
+)
 
 
 class GeminiService:
     """
     Gemini 模型服務
+
+    每個方法皆有對應的 *_async 版本，使用 client.aio 以非阻塞方式呼叫，
+    讓單一 worker 可以同時處理多個 LLM 請求而不佔用 threadpool。
+    若提供 response_cache，相同 (或語意相近) 的 prompt 會直接回傳快取結果；
+    只有正常結束 (finish_reason 為 STOP) 且能依 response_schema 解析的回應才會寫入快取，
+    呼叫端因回應內容無效而重試時可傳入 bypass_cache=True 略過快取。
+    同時進行的相同請求 (模型、設定、schema 與 prompt 皆相同) 只會呼叫 Gemini 一次，結果共用。
+    所有呼叫都經過 scheduler 依配額與優先順序放行；失敗時拋出 GeminiServiceError，
+    配額不足 (429 重試後仍失敗或排隊逾時) 時拋出 GeminiOverloadedError。
+
+    每次呼叫依 profile (見 generation_profile.py) 建立新的生成設定，並發請求之間不共用可變狀態；
+    實際使用的模型由 router 依 prompt 長度與該 profile 近期的 p95 延遲決定。
     """
 
     def __init__(
@@ -15,52 +57,501 @@ class GeminiService:
         model: str,
         response_type="application/json",
         model_thinking_budget=0,
+        response_cache: Optional[SemanticResponseCache] = None,
+        scheduler: Optional[GeminiScheduler] = None,
+        max_rate_limit_retries: int = 3,
+        expected_output_tokens: int = 1024,
+        profiles: Optional[Dict[str, GenerationProfile]] = None,
+        router: Optional[ModelRouter] = None,
     ):
         self.client = client
         self.model = model
-        self.model_config = GenerateContentConfig(
-            thinking_config=ThinkingConfig(thinking_budget=model_thinking_budget),
-            response_mime_type=response_type,  # 強制回傳指定格式
-        )
         """
         thinking_budget: int
             0: No thinking (default)
             -1: dynamic thinking (model decides the level)
             512 / 1024: Basic thinking 指定 token 數量上限
         """
+        self.profiles = profiles or build_profiles(
+            model, model_thinking_budget, response_type=response_type
+        )
+        self.router = router or ModelRouter()
+        self.response_cache = response_cache
+        self.scheduler = scheduler or GeminiScheduler()
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.expected_output_tokens = expected_output_tokens
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
+        metrics = get_metrics_registry()
+        self.requests_total = metrics.counter(
+            "gemini_requests_total",
+            "Gemini calls by outcome (ok, error, rate_limited, cache_hit)",
+            ("model", "outcome"),
+        )
+        self.latency_seconds = metrics.histogram(
+            "gemini_latency_seconds", "Gemini call latency", ("model",)
+        )
+        self.tokens_total = metrics.counter(
+            "gemini_tokens_total",
+            "Gemini token usage from response usage_metadata",
+            ("model", "type"),
+        )
+        self.prompt_chars = metrics.histogram(
+            "gemini_prompt_chars", "Prompt size in characters", ("model",), SIZE_BUCKETS
+        )
+        self.response_chars = metrics.histogram(
+            "gemini_response_chars",
+            "Response size in characters",
+            ("model",),
+            SIZE_BUCKETS,
+        )
+        self.route_total = metrics.counter(
+            "gemini_route_total",
+            "Model chosen for each Gemini call (primary, short_prompt, latency_budget)",
+            ("profile", "model", "reason"),
+        )
+        self.profile_latency_seconds = metrics.histogram(
+            "gemini_profile_latency_seconds",
+            "Gemini call latency by generation profile",
+            ("profile", "model"),
+        )
+        self.profile_tokens_total = metrics.counter(
+            "gemini_profile_tokens_total",
+            "Gemini token usage by generation profile",
+            ("profile", "type"),
+        )
 
-    # 將問題精簡摘要
-    def generate_search_query(self, question: str) -> Optional[str]:
-        prompt = f"Generate a concise search query for the following question: {question}, without extra text."
+    def profile(self, name: str) -> GenerationProfile:
         try:
-            return self.client.models.generate_content(
-                model="gemini-2.5-flash-lite", contents=prompt
-            ).text
-        except Exception as e:
+            return self.profiles[name]
+        except KeyError:
+            raise ValueError(f"Unknown generation profile: {name}") from None
+
+    def _route(
+        self, profile_name: str, prompt: str, response_schema=None
+    ) -> Tuple[GenerationProfile, str, object]:
+        """
+        選擇這次呼叫的模型，並建立只屬於這次呼叫的 GenerateContentConfig
+
+        Returns:
+            (profile, model, config)
+        """
+        profile = self.profile(profile_name)
+        model, reason = self.router.choose(profile, prompt)
+        self.route_total.inc(profile=profile.name, model=model, reason=reason)
+        return profile, model, profile.to_config(response_schema)
+
+    def _record_call(
+        self,
+        profile: GenerationProfile,
+        model: str,
+        prompt: str,
+        text: Optional[str],
+        usage,
+        seconds: float,
+    ):
+        """
+        記錄一次 Gemini 呼叫的延遲、prompt / 回應大小與 token 用量
+        """
+        self.requests_total.inc(model=model, outcome="ok")
+        self.latency_seconds.observe(seconds, model=model)
+        self.profile_latency_seconds.observe(seconds, profile=profile.name, model=model)
+        self.router.observe(profile.name, model, seconds)
+        self.prompt_chars.observe(len(prompt), model=model)
+        self.response_chars.observe(len(text or ""), model=model)
+        if usage is None:
+            return
+        tokens = {
+            "prompt": usage.prompt_token_count or 0,
+            "response": usage.candidates_token_count or 0,
+            "total": usage.total_token_count or 0,
+        }
+        for token_type, count in tokens.items():
+            self.tokens_total.inc(count, model=model, type=token_type)
+            self.profile_tokens_total.inc(count, profile=profile.name, type=token_type)
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["gemini_tokens"] = (
+                trace.attributes.get("gemini_tokens", 0) + tokens["total"]
+            )
+
+    @staticmethod
+    def _finish_reason(response):
+        candidates = getattr(response, "candidates", None)
+        return getattr(candidates[0], "finish_reason", None) if candidates else None
+
+    @staticmethod
+    def _cacheable(text: Optional[str], finish_reason, config, response_schema) -> bool:
+        """
+        回應是否可寫入快取: 正常結束 (未因 token 上限等原因中斷) 且內容可解析
+        """
+        if not text:
+            return False
+        if finish_reason is not None and finish_reason != genai.types.FinishReason.STOP:
+            return False
+        try:
+            if response_schema is not None:
+                try:
+                    adapter = TypeAdapter(response_schema)
+                except Exception:
+                    # 非 Python 型別的 schema (例如 dict) 只檢查 JSON 格式
+                    adapter = None
+                if adapter is not None:
+                    adapter.validate_json(text)
+                    return True
+            if getattr(config, "response_mime_type", None) == "application/json":
+                json.loads(text)
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def _search_query_prompt(question: str) -> str:
+        return f"Generate a concise search query for the following question: {question}, without extra text."
+
+    @staticmethod
+    def _cache_namespace(model: str, config, response_schema=None) -> dict:
+        if response_schema is not None:
+            schema = f"{response_schema.__module__}.{response_schema.__qualname__}"
+        else:
+            schema = None
+        return {
+            "model": model,
+            "config": config.model_dump_json(exclude={"response_schema"})
+            if config
+            else None,
+            "schema": schema,
+        }
+
+    def single_flight_stats(self) -> dict:
+        """
+        合併的同時呼叫數量 (collapsed)，同步與 async 路徑合計
+        """
+        sync_stats = self.single_flight.stats()
+        async_stats = self.async_single_flight.stats()
+        return {key: sync_stats[key] + async_stats[key] for key in sync_stats}
+
+    @staticmethod
+    def _flight_key(namespace: dict, prompt: str) -> str:
+        payload = json.dumps(namespace, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{payload}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _estimate_tokens(self, prompt: str, profile: GenerationProfile) -> int:
+        """
+        呼叫前預估的 token 用量，取得回應後以 usage_metadata 修正
+        """
+        return len(prompt) // 2 + (
+            profile.max_output_tokens or self.expected_output_tokens
+        )
+
+    def _settle(self, model: str, estimated_tokens: int, usage):
+        self.scheduler.record_success(model)
+        if usage is not None and usage.total_token_count:
+            self.scheduler.settle(model, estimated_tokens, usage.total_token_count)
+
+    def _handle_error(self, model: str, error: Exception, attempt: int):
+        """
+        429 時通知 scheduler 暫停該模型並回傳 (由呼叫端重試)，其餘錯誤轉為 GeminiServiceError
+        """
+        if not is_rate_limit_error(error):
+            self.requests_total.inc(model=model, outcome="error")
+            raise GeminiServiceError(f"Gemini request failed: {error}") from error
+        self.requests_total.inc(model=model, outcome="rate_limited")
+        backoff = self.scheduler.record_rate_limited(model)
+        print(
+            f"[GeminiService] Rate limited on {model} "
+            f"(attempt {attempt + 1}), backing off {backoff:.1f}s"
+        )
+        if attempt >= self.max_rate_limit_retries:
+            raise GeminiOverloadedError(
+                f"Gemini quota exhausted for {model}", retry_after=backoff
+            ) from error
+
+    def _call_model(
+        self,
+        profile: GenerationProfile,
+        model: str,
+        prompt: str,
+        config,
+        namespace: dict,
+        semantic_text,
+        priority: int,
+        response_schema=None,
+    ) -> str:
+        estimated_tokens = self._estimate_tokens(prompt, profile)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            self.scheduler.acquire(model, estimated_tokens, priority)
+            start = time.perf_counter()
+            try:
+                response = self.client.models.generate_content(
+                    model=model, contents=prompt, config=config
+                )
+                break
+            except Exception as e:
+                self._handle_error(model, e, attempt)
+        text = response.text
+        latency = time.perf_counter() - start
+        usage = getattr(response, "usage_metadata", None)
+        self._settle(model, estimated_tokens, usage)
+        self._record_call(profile, model, prompt, text, usage, latency)
+        if self.response_cache and self._cacheable(
+            text, self._finish_reason(response), config, response_schema
+        ):
+            self.response_cache.store(namespace, prompt, text, latency, semantic_text)
+        return text
+
+    async def _call_model_async(
+        self,
+        profile: GenerationProfile,
+        model: str,
+        prompt: str,
+        config,
+        namespace: dict,
+        semantic_text,
+        priority: int,
+        response_schema=None,
+    ) -> str:
+        estimated_tokens = self._estimate_tokens(prompt, profile)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            await self.scheduler.acquire_async(model, estimated_tokens, priority)
+            start = time.perf_counter()
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=model, contents=prompt, config=config
+                )
+                break
+            except Exception as e:
+                self._handle_error(model, e, attempt)
+        text = response.text
+        latency = time.perf_counter() - start
+        usage = getattr(response, "usage_metadata", None)
+        self._settle(model, estimated_tokens, usage)
+        self._record_call(profile, model, prompt, text, usage, latency)
+        if self.response_cache and self._cacheable(
+            text, self._finish_reason(response), config, response_schema
+        ):
+            if semantic_text:
+                await asyncio.to_thread(
+                    self.response_cache.store,
+                    namespace,
+                    prompt,
+                    text,
+                    latency,
+                    semantic_text,
+                )
+            else:
+                self.response_cache.store(namespace, prompt, text, latency)
+        return text
+
+    def _generate(
+        self,
+        profile_name: str,
+        prompt: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_DEFAULT,
+        bypass_cache: bool = False,
+    ) -> str:
+        profile, model, config = self._route(profile_name, prompt, response_schema)
+        namespace = self._cache_namespace(model, config, response_schema)
+        if self.response_cache and not bypass_cache:
+            cached = self.response_cache.lookup(namespace, prompt, semantic_text)
+            if cached is not None:
+                self.requests_total.inc(model=model, outcome="cache_hit")
+                return cached
+        # 相同的請求正在進行時，等待其結果而不重複呼叫 Gemini
+        return self.single_flight.do(
+            self._flight_key(namespace, prompt),
+            lambda: self._call_model(
+                profile,
+                model,
+                prompt,
+                config,
+                namespace,
+                semantic_text,
+                priority,
+                response_schema,
+            ),
+        )
+
+    async def _generate_async(
+        self,
+        profile_name: str,
+        prompt: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_DEFAULT,
+        bypass_cache: bool = False,
+    ) -> str:
+        profile, model, config = self._route(profile_name, prompt, response_schema)
+        namespace = self._cache_namespace(model, config, response_schema)
+        if self.response_cache and not bypass_cache:
+            if semantic_text:
+                # 語意比對需要計算 embedding，放到 thread 避免阻塞 event loop
+                cached = await asyncio.to_thread(
+                    self.response_cache.lookup, namespace, prompt, semantic_text
+                )
+            else:
+                cached = self.response_cache.lookup(namespace, prompt)
+            if cached is not None:
+                self.requests_total.inc(model=model, outcome="cache_hit")
+                return cached
+        return await self.async_single_flight.do(
+            self._flight_key(namespace, prompt),
+            lambda: self._call_model_async(
+                profile,
+                model,
+                prompt,
+                config,
+                namespace,
+                semantic_text,
+                priority,
+                response_schema,
+            ),
+        )
+
+    # 將問題精簡摘要，失敗時回傳 None (不使用 Google 搜尋結果)
+    def generate_search_query(
+        self, question: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[str]:
+        prompt = self._search_query_prompt(question)
+        try:
+            return self._generate(
+                PROFILE_SEARCH_QUERY,
+                prompt,
+                semantic_text=question,
+                priority=priority,
+            )
+        except GeminiServiceError as e:
             print(f"[GeminiService] Error generating search query: {e}")
             return None
 
-    # 根據主題生成相關問題
-    def generate_question(self, topic: str, response_schema=None) -> str:
-        prompt = topic
+    async def generate_search_query_async(
+        self, question: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[str]:
+        prompt = self._search_query_prompt(question)
         try:
-            if response_schema:
-                self.model_config.response_schema = response_schema
-            return self.client.models.generate_content(
-                model=self.model, contents=prompt, config=self.model_config
-            ).text
-        except Exception as e:
-            print(f"[GeminiService] Error generating question: {e}")
-            return "ERROR"
+            return await self._generate_async(
+                PROFILE_SEARCH_QUERY,
+                prompt,
+                semantic_text=question,
+                priority=priority,
+            )
+        except GeminiServiceError as e:
+            print(f"[GeminiService] Error generating search query: {e}")
+            return None
+
+    # 根據主題生成相關問題
+    def generate_question(
+        self,
+        topic: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        profile: str = PROFILE_QUESTIONS,
+    ) -> str:
+        return self._generate(profile, topic, response_schema, semantic_text, priority)
+
+    async def generate_question_async(
+        self,
+        topic: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        profile: str = PROFILE_QUESTIONS,
+    ) -> str:
+        return await self._generate_async(
+            profile, topic, response_schema, semantic_text, priority
+        )
 
     # 通用的生成方法
-    def generate_answer(self, prompt: str, response_schema=None) -> str:
+    def generate_answer(
+        self,
+        prompt: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_DEFAULT,
+        profile: str = PROFILE_DEFAULT,
+        bypass_cache: bool = False,
+    ) -> str:
+        return self._generate(
+            profile, prompt, response_schema, semantic_text, priority, bypass_cache
+        )
+
+    async def generate_answer_async(
+        self,
+        prompt: str,
+        response_schema=None,
+        semantic_text: Optional[str] = None,
+        priority: int = PRIORITY_DEFAULT,
+        profile: str = PROFILE_DEFAULT,
+        bypass_cache: bool = False,
+    ) -> str:
+        return await self._generate_async(
+            profile, prompt, response_schema, semantic_text, priority, bypass_cache
+        )
+
+    async def generate_answer_stream_async(
+        self,
+        prompt: str,
+        response_schema=None,
+        priority: int = PRIORITY_INTERACTIVE,
+        profile: str = PROFILE_DEFAULT,
+    ) -> AsyncIterator[str]:
+        """
+        以串流方式生成回答，逐段回傳模型輸出的文字
+
+        快取命中時一次回傳完整內容；串流正常結束且內容可解析時才將完整結果寫入快取。
+        錯誤會以 GeminiServiceError / GeminiOverloadedError 拋出，由呼叫端決定如何通知客戶端；
+        已開始輸出後不會重試。
+        """
+        generation_profile, model, config = self._route(
+            profile, prompt, response_schema
+        )
+        namespace = None
+        if self.response_cache:
+            namespace = self._cache_namespace(model, config, response_schema)
+            cached = self.response_cache.lookup(namespace, prompt)
+            if cached is not None:
+                self.requests_total.inc(model=model, outcome="cache_hit")
+                yield cached
+                return
+        estimated_tokens = self._estimate_tokens(prompt, generation_profile)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            await self.scheduler.acquire_async(model, estimated_tokens, priority)
+            start = time.perf_counter()
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=model, contents=prompt, config=config
+                )
+                break
+            except Exception as e:
+                self._handle_error(model, e, attempt)
+        parts = []
+        usage = finish_reason = None
         try:
-            if response_schema:
-                self.model_config.response_schema = response_schema
-            return self.client.models.generate_content(
-                model=self.model, contents=prompt, config=self.model_config
-            ).text
+            async for chunk in stream:
+                # usage_metadata 與 finish_reason 通常只在最後一個 chunk 才是完整的
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                finish_reason = self._finish_reason(chunk) or finish_reason
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
         except Exception as e:
-            print(f"[GeminiService] Error generating answer: {e}")
-            return "抱歉，發生錯誤，無法生成回答。"
+            self._handle_error(model, e, self.max_rate_limit_retries)
+        self._settle(model, estimated_tokens, usage)
+        self._record_call(
+            generation_profile,
+            model,
+            prompt,
+            "".join(parts),
+            usage,
+            time.perf_counter() - start,
+        )
+        text = "".join(parts)
+        if self.response_cache and self._cacheable(
+            text, finish_reason, config, response_schema
+        ):
+            self.response_cache.store(
+                namespace, prompt, text, time.perf_counter() - start
+            )
@@ -0,0 +1,165 @@
+import dataclasses
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from google.genai.types import GenerateContentConfig, ThinkingConfig
+
+PROFILE_SEARCH_QUERY = "search_query"  # 生成搜尋關鍵字
+PROFILE_QUESTIONS = "questions"  # 生成額外問題
+PROFILE_COURSE = "course"  # 生成課程大綱
+PROFILE_CHAPTER = "chapter"  # 生成章節內容
+PROFILE_DEFAULT = "default"
+
+DEFAULT_SEARCH_QUERY_MODEL = "gemini-2.5-flash-lite"
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    一種生成任務的模型與生成設定，不可修改，每次呼叫依此建立新的 GenerateContentConfig
+
+    thinking_budget: None 表示使用模型預設值，0 為不思考，-1 為動態思考
+    fast_model: 設定時由 ModelRouter 在 prompt 長度不超過 short_prompt_chars，
+        或主要模型近期的 p95 延遲超過 latency_budget_seconds 時改用此模型
+    """
+
+    name: str
+    model: str
+    thinking_budget: Optional[int] = 0
+    max_output_tokens: Optional[int] = None
+    response_mime_type: Optional[str] = "application/json"
+    fast_model: Optional[str] = None
+    short_prompt_chars: int = 0
+    latency_budget_seconds: Optional[float] = None
+
+    def to_config(self, response_schema=None) -> GenerateContentConfig:
+        return GenerateContentConfig(
+            thinking_config=ThinkingConfig(thinking_budget=self.thinking_budget)
+            if self.thinking_budget is not None
+            else None,
+            max_output_tokens=self.max_output_tokens,
+            response_mime_type=self.response_mime_type,  # 強制回傳指定格式
+            response_schema=response_schema,
+        )
+
+
+def build_profiles(
+    model: str,
+    thinking_budget: Optional[int] = 0,
+    search_query_model: str = DEFAULT_SEARCH_QUERY_MODEL,
+    fast_model: Optional[str] = None,
+    response_type: str = "application/json",
+    overrides: Optional[Dict[str, dict]] = None,
+) -> Dict[str, GenerationProfile]:
+    """
+    建立各端點的預設 profile，overrides 可依 profile 名稱覆寫個別欄位
+
+    生成問題是使用者等待中的短回應，不使用 thinking；課程大綱與章節內容沿用 thinking_budget。
+    """
+    profiles = {
+        PROFILE_SEARCH_QUERY: GenerationProfile(
+            PROFILE_SEARCH_QUERY,
+            search_query_model,
+            thinking_budget=0,
+            max_output_tokens=64,
+            response_mime_type=None,
+        ),
+        PROFILE_QUESTIONS: GenerationProfile(
+            PROFILE_QUESTIONS,
+            model,
+            thinking_budget=0,
+            response_mime_type=response_type,
+            fast_model=fast_model,
+            latency_budget_seconds=8.0,
+        ),
+        PROFILE_COURSE: GenerationProfile(
+            PROFILE_COURSE,
+            model,
+            thinking_budget=thinking_budget,
+            response_mime_type=response_type,
+            fast_model=fast_model,
+            # 模板約 800 字，檢索結果很少時 prompt 短、輸出也較簡單
+            short_prompt_chars=1500,
+            latency_budget_seconds=30.0,
+        ),
+        PROFILE_CHAPTER: GenerationProfile(
+            PROFILE_CHAPTER,
+            model,
+            thinking_budget=thinking_budget,
+            response_mime_type=response_type,
+        ),
+        PROFILE_DEFAULT: GenerationProfile(
+            PROFILE_DEFAULT,
+            model,
+            thinking_budget=thinking_budget,
+            response_mime_type=response_type,
+        ),
+    }
+    for name, fields in (overrides or {}).items():
+        base = profiles.get(name) or dataclasses.replace(
+            profiles[PROFILE_DEFAULT], name=name
+        )
+        profiles[name] = dataclasses.replace(base, **fields)
+    return profiles
+
+
+class ModelRouter:
+    """
+    依 prompt 長度與近期延遲為每次呼叫選擇模型
+
+    延遲以 (profile, model) 分開記錄，只計算 window_seconds 內的呼叫；
+    改用快速模型後主要模型不再有新資料，舊資料過期後會自動切回主要模型重新量測。
+    """
+
+    def __init__(
+        self, window_seconds: float = 300.0, min_samples: int = 20, max_samples=1000
+    ):
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._latencies: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, profile: str, model: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.get((profile, model))
+            if samples is None:
+                samples = self._latencies[(profile, model)] = deque(
+                    maxlen=self.max_samples
+                )
+            samples.append((time.monotonic(), seconds))
+
+    def p95(self, profile: str, model: str) -> Optional[float]:
+        """
+        近期呼叫的 p95 延遲，樣本不足 min_samples 時回傳 None
+        """
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            samples = self._latencies.get((profile, model))
+            if not samples:
+                return None
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            latencies = sorted(seconds for _, seconds in samples)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[math.ceil(len(latencies) * 0.95) - 1]
+
+    def choose(self, profile: GenerationProfile, prompt: str) -> Tuple[str, str]:
+        """
+        Returns:
+            (model, reason)，reason 為 primary / short_prompt / latency_budget
+        """
+        if not profile.fast_model or profile.fast_model == profile.model:
+            return profile.model, "primary"
+        if len(prompt) <= profile.short_prompt_chars:
+            return profile.fast_model, "short_prompt"
+        if profile.latency_budget_seconds is not None:
+            p95 = self.p95(profile.name, profile.model)
+            if p95 is not None and p95 > profile.latency_budget_seconds:
+                return profile.fast_model, "latency_budget"
+        return profile.model, "primary"
@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class JobTracker(ABC):
+    """
+    背景工作的進度紀錄介面
+    """
+
+    @abstractmethod
+    def create(self, kind: str, total: int) -> str:
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def set_status(self, job_id: str, status: str):
+        pass
+
+    @abstractmethod
+    def mark_item(self, job_id: str, item_id, status: str, error: str = None):
+        """
+        記錄單一項目的結果，status 為 "completed" 或 "failed"
+        """
+        pass
+
+    @abstractmethod
+    def interrupt_unfinished(self) -> int:
+        """
+        將尚未結束 (pending / running) 的工作標記為 interrupted，回傳標記的數量
+
+        只能在沒有任何 worker 執行工作時呼叫 (服務啟動前)
+        """
+        pass
+
+
+class InMemoryJobTracker(JobTracker):
+    """
+    行程內的背景工作進度紀錄 (單一 worker 使用)
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: dict = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, total: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "pending",
+                "total": total,
+                "completed": 0,
+                "failed": 0,
+                "items": {},
+                "errors": [],
+                "created_at": now,
+                "updated_at": now,
+            }
+            # 移除最舊的工作紀錄，避免無限成長
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.pop(next(iter(self._jobs)))
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, "items": dict(job["items"]), "errors": list(job["errors"])}
+
+    def set_status(self, job_id: str, status: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:  # 已被移除的工作紀錄
+                return
+            job["status"] = status
+            job["updated_at"] = time.time()
+
+    def mark_item(self, job_id: str, item_id, status: str, error: str = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["items"][str(item_id)] = status
+            job[status] += 1
+            if error:
+                job["errors"].append({"item": str(item_id), "message": error})
+            job["updated_at"] = time.time()
+
+    def interrupt_unfinished(self) -> int:
+        count = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] in ("pending", "running"):
+                    job["status"] = "interrupted"
+                    job["updated_at"] = time.time()
+                    count += 1
+        return count
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class SessionNotFoundError(LookupError):
+    """
+    使用者的 session 不存在，或已過期 / 被淘汰
+    """
+
+
+class SessionStore(ABC):
+    """
+    使用者暫存資料 (session) 儲存介面
+    """
+
+    @abstractmethod
+    def get(self, user_id) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def set(self, user_id, data: dict):
+        pass
+
+    @abstractmethod
+    def delete(self, user_id):
+        pass
+
+    def update(self, user_id, fields: dict) -> bool:
+        """
+        更新既有 session 的部分欄位，session 不存在 (或已過期) 時不建立並回傳 False
+        """
+        data = self.get(user_id)
+        if data is None:
+            return False
+        self.set(user_id, {**data, **fields})
+        return True
+
+    def migrate_legacy_file(self, file_path: str) -> int:
+        """
+        將舊版 user_temp.json 匯入 session store，匯入後改名為 *.migrated
+
+        先改名再讀取，多個 worker 同時啟動時只有一個會執行匯入。
+        """
+        if not os.path.exists(file_path):
+            return 0
+        migrated_path = f"{file_path}.migrated"
+        try:
+            os.replace(file_path, migrated_path)
+        except FileNotFoundError:
+            return 0
+        try:
+            with open(migrated_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[SessionStore] Error loading legacy temp file: {e}")
+            return 0
+        for user_id, session in data.items():
+            self.set(user_id, session)
+        print(f"[SessionStore] Migrated {len(data)} sessions from {file_path}")
+        return len(data)
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    行程內的 session store，以 LRU 淘汰並支援 TTL
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> Optional[dict]:
+        key = str(user_id)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def set(self, user_id, data: dict):
+        key = str(user_id)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (data, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def update(self, user_id, fields: dict) -> bool:
+        key = str(user_id)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+                return False
+            self._data[key] = ({**entry[0], **fields}, entry[1])
+            return True
+
+    def delete(self, user_id):
+        with self._lock:
+            self._data.pop(str(user_id), None)
@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    以 (chunk 內容 hash, 模型名稱) 為 key 的 embedding 磁碟快取
+
+    重新切割或重建索引時，內容未變的 chunk 不需要再經過 embedding 模型。
+    """
+
+    def __init__(self, db_path: str, model_name: str):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    content_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (content_hash, model)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        content_hashes = list(content_hashes)
+        found = {}
+        # SQLite 單一語句的參數數量有上限，分段查詢
+        for start in range(0, len(content_hashes), 500):
+            part = content_hashes[start : start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = (
+                self._connect()
+                .execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    (self.model_name, *part),
+                )
+                .fetchall()
+            )
+            for content_hash, vector in rows:
+                found[content_hash] = np.frombuffer(vector, dtype=np.float32)
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        if not embeddings:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, vector) "
+                "VALUES (?, ?, ?)",
+                [
+                    (
+                        content_hash,
+                        self.model_name,
+                        np.asarray(vector, dtype=np.float32).tobytes(),
+                    )
+                    for content_hash, vector in embeddings.items()
+                ],
+            )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
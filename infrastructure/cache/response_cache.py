@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from infrastructure.cache.lru_cache import LRUCache
+
+
+class ResponseCacheBackend(ABC):
+    """
+    LLM 回應快取的儲存介面
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: dict):
+        pass
+
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = None):
+        self.cache = LRUCache(max_size=max_entries, ttl=ttl)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.cache.get(key)
+
+    def set(self, key: str, entry: dict):
+        self.cache.set(key, entry)
+
+
+class SemanticResponseCache:
+    """
+    LLM 回應快取
+
+    - 精確比對: 以 (namespace, prompt) 的 sha256 為 key
+    - 語意比對 (可選): 以 embedding 的 cosine 相似度找出相近的 prompt，
+      相似度需大於 similarity_threshold 才視為命中
+
+    namespace 需包含模型名稱、設定與 response schema，避免不同設定共用結果。
+    """
+
+    def __init__(
+        self,
+        backend: ResponseCacheBackend,
+        embedding_model=None,
+        similarity_threshold: float = 0.95,
+        max_semantic_entries: int = 1000,
+    ):
+        self.backend = backend
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        # namespace key -> OrderedDict[exact key -> 正規化後的 embedding]
+        self._semantic_index: dict = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def namespace_key(namespace: dict) -> str:
+        return hashlib.sha256(
+            json.dumps(namespace, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def exact_key(namespace_key: str, prompt: str) -> str:
+        return hashlib.sha256(f"{namespace_key}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_model.encode(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hit(self, entry: dict, semantic: bool) -> str:
+        with self._lock:
+            if semantic:
+                self.semantic_hits += 1
+            else:
+                self.exact_hits += 1
+            self.latency_saved += entry.get("latency", 0.0)
+        return entry["response"]
+
+    def lookup(
+        self, namespace: dict, prompt: str, semantic_text: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        查詢快取，semantic_text 為 None 時只做精確比對
+        """
+        ns_key = self.namespace_key(namespace)
+        entry = self.backend.get(self.exact_key(ns_key, prompt))
+        if entry is not None:
+            return self._hit(entry, semantic=False)
+
+        if semantic_text and self.embedding_model is not None:
+            query = self._embed(semantic_text)
+            with self._lock:
+                index = self._semantic_index.get(ns_key)
+                candidates = list(index.items()) if index else []
+            if candidates:
+                keys = [key for key, _ in candidates]
+                scores = np.stack([vector for _, vector in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    entry = self.backend.get(keys[best])
+                    if entry is not None:
+                        return self._hit(entry, semantic=True)
+                    # 已過期或被淘汰，一併移除索引
+                    with self._lock:
+                        index.pop(keys[best], None)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        namespace: dict,
+        prompt: str,
+        response: str,
+        latency: float = 0.0,
+        semantic_text: Optional[str] = None,
+    ):
+        ns_key = self.namespace_key(namespace)
+        key = self.exact_key(ns_key, prompt)
+        self.backend.set(key, {"response": response, "latency": latency})
+        if semantic_text and self.embedding_model is not None:
+            vector = self._embed(semantic_text)
+            with self._lock:
+                index = self._semantic_index.setdefault(ns_key, OrderedDict())
+                index[key] = vector
+                index.move_to_end(key)
+                while len(index) > self.max_semantic_entries:
+                    index.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+        }
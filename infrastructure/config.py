@@ -1,11 +1,36 @@
+import json
 import os
+from typing import Dict, Optional
 
 from dotenv import load_dotenv
 from google import genai
-from sentence_transformers import SentenceTransformer
+
+from domain.services.gemini_scheduler import GeminiScheduler
+from domain.services.generation_profile import (
+    DEFAULT_SEARCH_QUERY_MODEL,
+    GenerationProfile,
+    build_profiles,
+)
+from domain.services.job_tracker import InMemoryJobTracker, JobTracker
+from domain.services.session_store import InMemorySessionStore, SessionStore
+from infrastructure.cache.embedding_cache import EmbeddingCache
+from infrastructure.cache.response_cache import (
+    InMemoryResponseCacheBackend,
+    SemanticResponseCache,
+)
+from infrastructure.db.sqlite_job_tracker import SQLiteJobTracker
+from infrastructure.db.sqlite_session_store import SQLiteSessionStore
+from infrastructure.embedding.embedding_backend import EmbeddingBackend
+from infrastructure.external.search_result_cache import SearchResultCache
+from infrastructure.http.http_client import AsyncHttpClient, HttpClient
+from infrastructure.ingestion.parallel_chunker import ParallelChunker
+from infrastructure.queue.ingestion_queue import IngestionQueue
+from infrastructure.queue.outbox import Outbox
 
 
 class Config:
+    DEFAULT_EMBEDDING_MODEL = "DMetaSoul/sbert-chinese-general-v2"
+
     def __init__(self):
         load_dotenv()
         self.GEMINI_API_KEY = os.environ.get("GOOGLE_GEMINI_API_KEY")
@@ -15,12 +40,280 @@ class Config:
         self.SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
         self.DB_URL = os.environ.get("DB_URL")
         self.GEMINI_MODEL = os.environ.get("GEMINI_MODEL")
-        self.EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL")
-        self.THINKING_BUDGET = os.environ.get("THINKING_BUDGET")
+        self.EMBEDDING_MODEL = (
+            os.environ.get("EMBEDDING_MODEL") or self.DEFAULT_EMBEDDING_MODEL
+        )
+        self.EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+        self.EMBEDDING_QUANTIZATION = os.environ.get("EMBEDDING_QUANTIZATION", "avx2")
+        self.EMBEDDING_ONNX_CACHE_DIR = os.environ.get(
+            "EMBEDDING_ONNX_CACHE_DIR", "models/onnx"
+        )
+        self.EMBEDDING_WARMUP = (
+            os.environ.get("EMBEDDING_WARMUP", "true").lower() == "true"
+        )
+        thinking_budget = os.environ.get("THINKING_BUDGET")
+        self.THINKING_BUDGET = int(thinking_budget) if thinking_budget else None
         self.WEB_API_URL = os.environ.get("WEB_API_URL")
+        self.WEB_API_HEALTH_CHECK = (
+            os.environ.get("WEB_API_HEALTH_CHECK", "true").lower() == "true"
+        )
+        self.EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+        self.UPSERT_BATCH_SIZE = int(os.environ.get("UPSERT_BATCH_SIZE", 500))
+        self.QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", 1024))
+        self.SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+        self.SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "user_sessions.db")
+        self.SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", 86400))
+        self.SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", 10000))
+        self.RESPONSE_CACHE_ENABLED = (
+            os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.RESPONSE_CACHE_SEMANTIC = (
+            os.environ.get("RESPONSE_CACHE_SEMANTIC", "true").lower() == "true"
+        )
+        self.RESPONSE_CACHE_TTL_SECONDS = float(
+            os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 3600)
+        )
+        self.RESPONSE_CACHE_MAX_ENTRIES = int(
+            os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1000)
+        )
+        self.RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(
+            os.environ.get("RESPONSE_CACHE_SIMILARITY_THRESHOLD", 0.95)
+        )
+        self.CHAPTER_GENERATION_CONCURRENCY = int(
+            os.environ.get("CHAPTER_GENERATION_CONCURRENCY", 4)
+        )
+        self.CHAPTER_GENERATION_MAX_RETRIES = int(
+            os.environ.get("CHAPTER_GENERATION_MAX_RETRIES", 2)
+        )
+        self.HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+        self.HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+        self.HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+        self.HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.5))
+        self.HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))
+        # 上游 Retry-After 超過此秒數時不再等待重試
+        self.HTTP_MAX_RETRY_AFTER = float(os.environ.get("HTTP_MAX_RETRY_AFTER", 30))
+        self.SEARCH_CACHE_ENABLED = (
+            os.environ.get("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.SEARCH_CACHE_TTL_SECONDS = float(
+            os.environ.get("SEARCH_CACHE_TTL_SECONDS", 86400)
+        )
+        self.SEARCH_CACHE_STALE_SECONDS = float(
+            os.environ.get("SEARCH_CACHE_STALE_SECONDS", 7 * 86400)
+        )
+        self.SEARCH_CACHE_MAX_ENTRIES = int(
+            os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 1000)
+        )
+        self.SEARCH_CACHE_DB_PATH = os.environ.get("SEARCH_CACHE_DB_PATH")
+        self.SEARCH_CACHE_DB_MAX_ENTRIES = int(
+            os.environ.get("SEARCH_CACHE_DB_MAX_ENTRIES", 100000)
+        )
+        self.VECTOR_COLLECTION_NAME = os.environ.get("VECTOR_COLLECTION_NAME", "AItest")
+        self.VECTOR_DIMENSION = int(os.environ.get("VECTOR_DIMENSION", 768))
+        # 個別知識分區的設定，例如
+        # {"cs101": {"index_method": "hnsw", "index_arguments": {"m": 16}, "ef_search": 80}}
+        self.VECTOR_PARTITIONS = json.loads(os.environ.get("VECTOR_PARTITIONS", "{}"))
+        self.LOCAL_VECTOR_INDEX = (
+            os.environ.get("LOCAL_VECTOR_INDEX", "false").lower() == "true"
+        )
+        self.LOCAL_VECTOR_INDEX_MAX_ROWS = int(
+            os.environ.get("LOCAL_VECTOR_INDEX_MAX_ROWS", 200000)
+        )
+        self.EMBEDDING_CACHE_DB_PATH = os.environ.get(
+            "EMBEDDING_CACHE_DB_PATH", "embedding_cache.db"
+        )
+        self.INGESTION_QUEUE_DB_PATH = os.environ.get(
+            "INGESTION_QUEUE_DB_PATH", "ingestion_queue.db"
+        )
+        self.INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", 2))
+        # 工作租約的秒數，worker 超過此時間未回報進度即視為中斷，由其他 worker 接手
+        self.INGESTION_LEASE_SECONDS = float(
+            os.environ.get("INGESTION_LEASE_SECONDS", 300)
+        )
+        # 切割文件使用的行程數 (預設保留一個 CPU 給 embedding)，0 表示在 worker 執行緒中切割
+        self.INGESTION_CHUNK_PROCESSES = int(
+            os.environ.get(
+                "INGESTION_CHUNK_PROCESSES", min(max((os.cpu_count() or 1) - 1, 0), 4)
+            )
+        )
+        self.INGESTION_UPLOAD_DIR = os.environ.get("INGESTION_UPLOAD_DIR", "uploads")
+        self.INGESTION_UPLOAD_MAX_BYTES = int(
+            os.environ.get("INGESTION_UPLOAD_MAX_BYTES", 1 << 30)
+        )
+        self.JOB_TRACKER_BACKEND = os.environ.get("JOB_TRACKER_BACKEND", "sqlite")
+        self.JOB_TRACKER_DB_PATH = os.environ.get("JOB_TRACKER_DB_PATH", "jobs.db")
+        self.WEB_HOST = os.environ.get("WEB_HOST", "0.0.0.0")
+        self.WEB_PORT = int(os.environ.get("WEB_PORT", 8081))
+        # worker 行程數，大於 1 時啟用 prefork 模式 (見 interfaces/api/prefork_server.py)
+        self.WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+        # 每個 worker 執行阻塞呼叫 (asyncio.to_thread) 的執行緒數量
+        self.THREADPOOL_SIZE = int(os.environ.get("THREADPOOL_SIZE", 40))
+        self.PRELOAD_EMBEDDING_MODEL = (
+            os.environ.get("PRELOAD_EMBEDDING_MODEL", "true").lower() == "true"
+        )
+        self.OUTBOX_DB_PATH = os.environ.get("OUTBOX_DB_PATH", "outbox.db")
+        self.OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 20))
+        self.OUTBOX_CONCURRENCY = int(os.environ.get("OUTBOX_CONCURRENCY", 4))
+        self.OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+        self.GEMINI_RPM = float(os.environ.get("GEMINI_RPM", 0))
+        self.GEMINI_TPM = float(os.environ.get("GEMINI_TPM", 0))
+        # 個別模型的配額，例如 {"gemini-2.5-flash-lite": {"rpm": 4000, "tpm": 4000000}}
+        self.GEMINI_MODEL_LIMITS = json.loads(
+            os.environ.get("GEMINI_MODEL_LIMITS", "{}")
+        )
+        self.GEMINI_SEARCH_QUERY_MODEL = os.environ.get(
+            "GEMINI_SEARCH_QUERY_MODEL", DEFAULT_SEARCH_QUERY_MODEL
+        )
+        # 延遲超過預算或 prompt 很短時改用的模型，未設定時不切換
+        self.GEMINI_FAST_MODEL = os.environ.get("GEMINI_FAST_MODEL") or None
+        # 個別 profile 的設定，例如 {"chapter": {"thinking_budget": 1024, "max_output_tokens": 8192}}
+        self.GEMINI_PROFILES = json.loads(os.environ.get("GEMINI_PROFILES", "{}"))
+        self.GEMINI_ROUTER_WINDOW_SECONDS = float(
+            os.environ.get("GEMINI_ROUTER_WINDOW_SECONDS", 300)
+        )
+        self.GEMINI_QUEUE_MAX = int(os.environ.get("GEMINI_QUEUE_MAX", 1000))
+        self.GEMINI_QUEUE_MAX_WAIT_SECONDS = float(
+            os.environ.get("GEMINI_QUEUE_MAX_WAIT_SECONDS", 60)
+        )
+        self.GEMINI_RATE_LIMIT_RETRIES = int(
+            os.environ.get("GEMINI_RATE_LIMIT_RETRIES", 3)
+        )
+        self.RAG_CONTEXT_TOKEN_BUDGET = int(
+            os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", 2000)
+        )
+        # 個別提示詞模板的 RAG 上下文預算，例如 {"course_prompt_template.txt": 3000}
+        self.RAG_CONTEXT_TOKEN_BUDGETS = json.loads(
+            os.environ.get("RAG_CONTEXT_TOKEN_BUDGETS", "{}")
+        )
+        self.RETRIEVAL_PREFETCH = (
+            os.environ.get("RETRIEVAL_PREFETCH", "true").lower() == "true"
+        )
+        self.RETRIEVAL_PREFETCH_TTL_SECONDS = float(
+            os.environ.get("RETRIEVAL_PREFETCH_TTL_SECONDS", 600)
+        )
+        self.REQUEST_TIMING_LOG = (
+            os.environ.get("REQUEST_TIMING_LOG", "false").lower() == "true"
+        )
 
     def configure_gemini(self) -> genai.Client:
         return genai.Client(api_key=self.GEMINI_API_KEY)
 
-    def get_embedding_model(self):
-        return SentenceTransformer("DMetaSoul/sbert-chinese-general-v2")
+    def get_gemini_scheduler(self) -> GeminiScheduler:
+        return GeminiScheduler(
+            default_rpm=self.GEMINI_RPM,
+            default_tpm=self.GEMINI_TPM,
+            model_limits=self.GEMINI_MODEL_LIMITS,
+            max_queue=self.GEMINI_QUEUE_MAX,
+            max_wait=self.GEMINI_QUEUE_MAX_WAIT_SECONDS,
+        )
+
+    def get_generation_profiles(self) -> Dict[str, GenerationProfile]:
+        return build_profiles(
+            self.GEMINI_MODEL,
+            self.THINKING_BUDGET,
+            search_query_model=self.GEMINI_SEARCH_QUERY_MODEL,
+            fast_model=self.GEMINI_FAST_MODEL,
+            overrides=self.GEMINI_PROFILES,
+        )
+
+    def get_rag_context_token_budget(self, prompt_template_file_name: str) -> int:
+        return int(
+            self.RAG_CONTEXT_TOKEN_BUDGETS.get(
+                prompt_template_file_name, self.RAG_CONTEXT_TOKEN_BUDGET
+            )
+        )
+
+    def get_embedding_model(self) -> EmbeddingBackend:
+        return EmbeddingBackend(
+            self.EMBEDDING_MODEL,
+            backend=self.EMBEDDING_BACKEND,
+            quantization=self.EMBEDDING_QUANTIZATION,
+            onnx_cache_dir=self.EMBEDDING_ONNX_CACHE_DIR,
+        )
+
+    def get_session_store(self, legacy_temp_file: str = None) -> SessionStore:
+        if self.SESSION_BACKEND == "memory":
+            store = InMemorySessionStore(
+                ttl=self.SESSION_TTL_SECONDS, max_entries=self.SESSION_MAX_ENTRIES
+            )
+        elif self.SESSION_BACKEND == "sqlite":
+            store = SQLiteSessionStore(
+                self.SESSION_DB_PATH,
+                ttl=self.SESSION_TTL_SECONDS,
+                max_entries=self.SESSION_MAX_ENTRIES,
+            )
+        else:
+            raise ValueError(f"Unsupported SESSION_BACKEND: {self.SESSION_BACKEND}")
+        if legacy_temp_file:
+            store.migrate_legacy_file(legacy_temp_file)
+        return store
+
+    def get_job_tracker(self) -> JobTracker:
+        if self.JOB_TRACKER_BACKEND == "memory":
+            return InMemoryJobTracker()
+        if self.JOB_TRACKER_BACKEND == "sqlite":
+            return SQLiteJobTracker(self.JOB_TRACKER_DB_PATH)
+        raise ValueError(f"Unsupported JOB_TRACKER_BACKEND: {self.JOB_TRACKER_BACKEND}")
+
+    def get_response_cache(
+        self, embedding_model=None
+    ) -> Optional[SemanticResponseCache]:
+        if not self.RESPONSE_CACHE_ENABLED:
+            return None
+        backend = InMemoryResponseCacheBackend(
+            max_entries=self.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=self.RESPONSE_CACHE_TTL_SECONDS,
+        )
+        return SemanticResponseCache(
+            backend,
+            embedding_model=embedding_model if self.RESPONSE_CACHE_SEMANTIC else None,
+            similarity_threshold=self.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+            max_semantic_entries=self.RESPONSE_CACHE_MAX_ENTRIES,
+        )
+
+    def _http_client_options(self) -> dict:
+        return {
+            "connect_timeout": self.HTTP_CONNECT_TIMEOUT,
+            "read_timeout": self.HTTP_READ_TIMEOUT,
+            "max_retries": self.HTTP_MAX_RETRIES,
+            "backoff_factor": self.HTTP_BACKOFF_FACTOR,
+            "pool_maxsize": self.HTTP_POOL_MAXSIZE,
+            "max_retry_after": self.HTTP_MAX_RETRY_AFTER,
+        }
+
+    def create_http_client(self) -> HttpClient:
+        return HttpClient(**self._http_client_options())
+
+    def create_async_http_client(self) -> AsyncHttpClient:
+        return AsyncHttpClient(**self._http_client_options())
+
+    def get_search_result_cache(self) -> Optional[SearchResultCache]:
+        if not self.SEARCH_CACHE_ENABLED:
+            return None
+        return SearchResultCache(
+            ttl=self.SEARCH_CACHE_TTL_SECONDS,
+            stale_ttl=self.SEARCH_CACHE_STALE_SECONDS,
+            max_entries=self.SEARCH_CACHE_MAX_ENTRIES,
+            db_path=self.SEARCH_CACHE_DB_PATH,
+            db_max_entries=self.SEARCH_CACHE_DB_MAX_ENTRIES,
+        )
+
+    def get_embedding_cache(
+        self, embedding_model: EmbeddingBackend
+    ) -> Optional[EmbeddingCache]:
+        if not self.EMBEDDING_CACHE_DB_PATH:
+            return None
+        return EmbeddingCache(self.EMBEDDING_CACHE_DB_PATH, embedding_model.cache_key)
+
+    def get_ingestion_queue(self) -> IngestionQueue:
+        return IngestionQueue(
+            self.INGESTION_QUEUE_DB_PATH, lease_seconds=self.INGESTION_LEASE_SECONDS
+        )
+
+    def get_parallel_chunker(self) -> Optional[ParallelChunker]:
+        if self.INGESTION_CHUNK_PROCESSES <= 0:
+            return None
+        return ParallelChunker(processes=self.INGESTION_CHUNK_PROCESSES)
+
+    def get_outbox(self) -> Outbox:
+        return Outbox(self.OUTBOX_DB_PATH)
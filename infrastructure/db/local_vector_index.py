@@ -0,0 +1,107 @@
+import threading
+from typing import Iterable, List
+
+import numpy as np
+
+
+class LocalVectorIndex:
+    """
+    行程內的向量索引 (NumPy 矩陣 + 暴力 cosine 搜尋)
+
+    向量在寫入時先正規化，查詢只需一次矩陣乘法與 argpartition。
+    對於可完整放進記憶體的知識庫，延遲遠低於經由網路查詢 pgvector。
+    回傳格式與 vecs 相同: (id, cosine_distance, metadata)。
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024):
+        self.dimension = dimension
+        self.ready = False
+        self._ids: List[str] = []
+        self._metadata: List[dict] = []
+        self._positions: dict = {}
+        self._matrix = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._positions
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, required: int):
+        capacity = max(self._matrix.shape[0], 1)
+        if required <= self._matrix.shape[0]:
+            return
+        while capacity < required:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        self._matrix = matrix
+
+    def upsert(self, records: Iterable[tuple]):
+        """
+        新增或更新向量，records 格式同 vecs: (id, vector, metadata)
+        """
+        records = list(records)
+        if not records:
+            return
+        vectors = self._normalize(
+            np.asarray([record[1] for record in records], dtype=np.float32)
+        )
+        with self._lock:
+            self._ensure_capacity(self._size + len(records))
+            for (record_id, _, metadata), vector in zip(records, vectors):
+                position = self._positions.get(record_id)
+                if position is None:
+                    position = self._size
+                    self._positions[record_id] = position
+                    self._ids.append(record_id)
+                    self._metadata.append(metadata)
+                    self._size += 1
+                else:
+                    self._metadata[position] = metadata
+                self._matrix[position] = vector
+
+    def metadata(self) -> List[dict]:
+        with self._lock:
+            return self._metadata[: self._size]
+
+    def mark_ready(self):
+        self.ready = True
+
+    def clear(self):
+        """
+        釋放所有向量與 metadata，索引回到未載入的狀態
+        """
+        with self._lock:
+            self.ready = False
+            self._ids = []
+            self._metadata = []
+            self._positions = {}
+            self._matrix = np.zeros((1, self.dimension), dtype=np.float32)
+            self._size = 0
+
+    def query(self, vector, limit: int = 10) -> list:
+        with self._lock:
+            size = self._size
+            matrix = self._matrix[:size]
+            ids = self._ids
+            metadata = self._metadata
+        if size == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = matrix @ query
+        limit = min(limit, size)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(1.0 - scores[i]), metadata[i]) for i in top]
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from domain.services.job_tracker import JobTracker
+
+
+class SQLiteJobTracker(JobTracker):
+    """
+    以 SQLite 保存背景工作進度，多個 worker 行程共用
+
+    工作可能由任一個 worker 執行，查詢進度的請求也可能送到另一個 worker。
+    """
+
+    def __init__(self, db_path: str, max_jobs: int = 1000):
+        self.db_path = db_path
+        self.max_jobs = max_jobs
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, item_id)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind: str, total: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, total, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?, ?)",
+                (job_id, kind, total, now, now),
+            )
+            # 移除最舊的工作紀錄，避免無限成長
+            stale = "SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+            conn.execute(
+                f"DELETE FROM job_items WHERE job_id IN ({stale})", (self.max_jobs,)
+            )
+            conn.execute(
+                f"DELETE FROM jobs WHERE job_id IN ({stale})", (self.max_jobs,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        items = conn.execute(
+            "SELECT item_id, status, error FROM job_items WHERE job_id = ? "
+            "ORDER BY updated_at",
+            (job_id,),
+        ).fetchall()
+        return {
+            **dict(row),
+            "items": {item["item_id"]: item["status"] for item in items},
+            "errors": [
+                {"item": item["item_id"], "message": item["error"]}
+                for item in items
+                if item["error"]
+            ],
+        }
+
+    def set_status(self, job_id: str, status: str):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+            (status, time.time(), job_id),
+        )
+
+    def mark_item(self, job_id: str, item_id, status: str, error: str = None):
+        if status not in ("completed", "failed"):
+            raise ValueError(f"Unsupported item status: {status}")
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = conn.execute(
+                f"UPDATE jobs SET {status} = {status} + 1, updated_at = ? WHERE job_id = ?",
+                (now, job_id),
+            ).rowcount
+            # 已被移除的工作紀錄不再寫入項目
+            if updated:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_items (job_id, item_id, status, error, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job_id, str(item_id), status, error, now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def interrupt_unfinished(self) -> int:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'interrupted', updated_at = ? "
+            "WHERE status IN ('pending', 'running')",
+            (time.time(),),
+        )
+        return cursor.rowcount
@@ -0,0 +1,135 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from domain.services.session_store import SessionStore
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    以 SQLite 儲存 session，可在多執行緒與多個 uvicorn worker 之間共用
+
+    - 以 user_id 為主鍵，單一使用者讀寫不需載入全部資料
+    - WAL 模式讓讀取不會被寫入阻塞
+    - 每 cleanup_interval 次寫入清除過期資料並淘汰最舊的 session
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+        cleanup_interval: int = 100,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._write_count = 0
+        self._count_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    user_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id) -> Optional[dict]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT data FROM sessions WHERE user_id = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (str(user_id), time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def set(self, user_id, data: dict):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO sessions (user_id, data, updated_at, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    data = excluded.data,
+                    updated_at = excluded.updated_at,
+                    expires_at = excluded.expires_at
+                """,
+                (str(user_id), json.dumps(data, ensure_ascii=False), now, expires_at),
+            )
+        with self._count_lock:
+            self._write_count += 1
+            should_cleanup = self._write_count % self.cleanup_interval == 0
+        if should_cleanup:
+            self.cleanup()
+
+    def update(self, user_id, fields: dict) -> bool:
+        """
+        在同一個交易中讀取並合併欄位，避免與其他 worker 的寫入互相覆蓋
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE user_id = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (str(user_id), time.time()),
+            ).fetchone()
+            if row is not None:
+                data = {**json.loads(row[0]), **fields}
+                conn.execute(
+                    "UPDATE sessions SET data = ?, updated_at = ? WHERE user_id = ?",
+                    (json.dumps(data, ensure_ascii=False), time.time(), str(user_id)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def delete(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE user_id = ?", (str(user_id),))
+
+    def cleanup(self):
+        """
+        清除過期 session，並在超過 max_entries 時淘汰最久未更新的資料
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM sessions WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            conn.execute(
+                """
+                DELETE FROM sessions WHERE user_id IN (
+                    SELECT user_id FROM sessions ORDER BY updated_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
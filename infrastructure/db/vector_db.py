@@ -1,41 +1,470 @@
-import uuid
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, Optional
 
 import vecs
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+from sqlalchemy import select
+
+from domain.models.knowledge import NAMESPACE_PATTERN
+from infrastructure.cache.embedding_cache import EmbeddingCache
+from infrastructure.cache.lru_cache import LRUCache
+from infrastructure.db.local_vector_index import LocalVectorIndex
+from infrastructure.embedding.embedding_backend import EmbeddingBackend
+from infrastructure.ingestion.parallel_chunker import (
+    ParallelChunker,
+    create_text_splitter,
+)
+from infrastructure.metrics.stage_stats import StageStats
+
+
+_NAMESPACE_RE = re.compile(NAMESPACE_PATTERN)
+
+
+@dataclass(frozen=True)
+class PartitionSettings:
+    """
+    單一知識分區 (collection) 的設定
+
+    index_method: auto / hnsw / ivfflat (vecs.IndexMethod)
+    index_arguments: hnsw 為 {"m": 16, "ef_construction": 64}，ivfflat 為 {"n_lists": 100}
+    ef_search / probes: 查詢時 hnsw 的候選數量與 ivfflat 掃描的 list 數
+    索引參數只在分區第一次建立索引時使用。
+    """
+
+    dimension: int = 768
+    index_method: str = "auto"
+    index_arguments: dict = field(default_factory=dict)
+    ef_search: int = 40
+    probes: int = 10
+
+    def index_args(self):
+        if self.index_method == "hnsw":
+            return vecs.IndexArgsHNSW(**self.index_arguments)
+        if self.index_method == "ivfflat" and self.index_arguments:
+            return vecs.IndexArgsIVFFlat(**self.index_arguments)
+        return None
+
+
+class VectorPartition:
+    """
+    一個 namespace 對應的 collection 與 (選用的) 行程內索引
+    """
+
+    def __init__(
+        self,
+        name: str,
+        collection,
+        settings: PartitionSettings,
+        local_index: Optional[LocalVectorIndex] = None,
+    ):
+        self.name = name
+        self.collection = collection
+        self.settings = settings
+        self.local_index = local_index
+
+    def ready_local_index(self) -> Optional[LocalVectorIndex]:
+        """
+        回傳已載入完成的行程內索引，否則回傳 None
+
+        load_local_index 可能隨時將 local_index 設為 None，呼叫端應使用回傳值而非再次讀取屬性。
+        """
+        local_index = self.local_index
+        return local_index if local_index is not None and local_index.ready else None
 
 
 class VectorDB:
-    def __init__(self, db_url: str, collection_name="AItest", dimension=768):
+    """
+    向量知識庫
+
+    知識依 namespace (例如課程、科目或租戶) 分別存放在獨立的 collection，
+    查詢只掃描該 namespace 的資料；未指定 namespace 時使用預設的 collection_name。
+    collection 只在第一次寫入該 namespace 時建立，查詢不存在的 namespace 時回傳空結果，
+    維度與索引參數可依 namespace 在 partitions 中設定。
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        embedding_model: EmbeddingBackend,
+        collection_name="AItest",
+        dimension=768,
+        encode_batch_size=32,
+        upsert_batch_size=500,
+        query_cache_size=1024,
+        local_index: Optional[LocalVectorIndex] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        partitions: Optional[Dict[str, dict]] = None,
+        local_index_max_rows: Optional[int] = None,
+    ):
+        self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache
+        self.collection_name = collection_name
+        self.default_settings = PartitionSettings(dimension=dimension)
+        self.partition_settings = {
+            self.normalize_namespace(name): PartitionSettings(
+                **{"dimension": dimension, **settings}
+            )
+            for name, settings in (partitions or {}).items()
+        }
+        # 有傳入 local_index 時，其他分區也在第一次使用時載入各自的行程內索引
+        self.use_local_index = local_index is not None
+        self.local_index_max_rows = local_index_max_rows
         self.vx = vecs.create_client(db_url)
-        self.collection = self.vx.get_or_create_collection(
-            name=collection_name, dimension=dimension
+        self._partitions: Dict[Optional[str], VectorPartition] = {}
+        self._partitions_lock = threading.Lock()
+        self.default_partition = self._open_partition(None, local_index, create=True)
+        self.encode_batch_size = encode_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.text_splitter = create_text_splitter()
+        # 查詢向量快取: 正規化後的查詢文字 -> embedding
+        self.query_cache = LRUCache(max_size=query_cache_size)
+
+    @property
+    def collection(self):
+        return self.default_partition.collection
+
+    @property
+    def local_index(self) -> Optional[LocalVectorIndex]:
+        return self.default_partition.local_index
+
+    @staticmethod
+    def normalize_namespace(namespace: Optional[str]) -> Optional[str]:
+        """
+        namespace 不分大小寫，CS101 與 cs101 對應到同一個 collection
+        """
+        if namespace is None:
+            return None
+        if not _NAMESPACE_RE.match(namespace):
+            raise ValueError(f"Invalid knowledge namespace: {namespace!r}")
+        return namespace.lower()
+
+    def _open_partition(
+        self,
+        namespace: Optional[str],
+        local_index: Optional[LocalVectorIndex],
+        create: bool,
+    ) -> Optional[VectorPartition]:
+        name = (
+            self.collection_name
+            if namespace is None
+            else f"{self.collection_name}_{namespace}"
         )
-        self.collection.create_index()
+        settings = self.partition_settings.get(namespace, self.default_settings)
+        if create:
+            collection = self.vx.get_or_create_collection(
+                name=name, dimension=settings.dimension
+            )
+            # create_index 預設會重建索引，只在 collection 尚未建立索引時執行
+            if not collection.is_indexed_for_measure(vecs.IndexMeasure.cosine_distance):
+                collection.create_index(
+                    measure=vecs.IndexMeasure.cosine_distance,
+                    method=vecs.IndexMethod(settings.index_method),
+                    index_arguments=settings.index_args(),
+                )
+        else:
+            try:
+                collection = self.vx.get_collection(name)
+            except vecs.exc.CollectionNotFound:
+                return None
+        partition = VectorPartition(name, collection, settings, local_index)
+        self._partitions[namespace] = partition
+        print(f"[VectorDB] Opened collection {name} (dimension {settings.dimension})")
+        return partition
 
-    def insert_vectors(
-        self, knowledge: list[str], embedding_model: SentenceTransformer
+    def partition(
+        self, namespace: Optional[str] = None, create: bool = False
+    ) -> Optional[VectorPartition]:
+        """
+        取得 namespace 對應的分區，第一次使用時開啟 collection 與行程內索引並快取
+
+        只有寫入知識時 (create=True) 才會建立 collection 與索引；
+        查詢不存在的 namespace 時回傳 None 且不會快取，任意 namespace 不會產生新的資料表。
+        """
+        namespace = self.normalize_namespace(namespace)
+        partition = self._partitions.get(namespace)
+        if partition is not None:
+            return partition
+        with self._partitions_lock:
+            partition = self._partitions.get(namespace)
+            if partition is not None:
+                return partition
+            local_index = None
+            if self.use_local_index:
+                dimension = self.partition_settings.get(
+                    namespace, self.default_settings
+                ).dimension
+                local_index = LocalVectorIndex(dimension=dimension)
+            partition = self._open_partition(namespace, local_index, create)
+        if partition is not None and local_index is not None:
+            self.load_local_index(self.local_index_max_rows, namespace=namespace)
+        return partition
+
+    def iter_chunks(self, knowledge: Iterable[str]) -> Iterator[str]:
+        """
+        逐篇切割文件，以 generator 方式逐一產出 chunk
+        """
+        for context in knowledge:
+            for chunk in self.text_splitter.split_text(context):
+                yield chunk
+
+    @staticmethod
+    def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _upsert(self, partition: VectorPartition, records: list):
+        partition.collection.upsert(records)
+        # 只讀取一次，避免 load_local_index 在兩次讀取之間將索引移除
+        local_index = partition.local_index
+        if local_index is not None:
+            local_index.upsert(records)
+
+    def load_local_index(
+        self,
+        max_rows: Optional[int] = None,
+        batch_size=1000,
+        namespace: Optional[str] = None,
     ):
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=100, chunk_overlap=20, separators=["\n", "。", "！", "？", "，"]
+        """
+        將 collection 中的向量載入行程內索引，超過 max_rows 時維持使用 pgvector
+
+        超過 max_rows 時會從分區移除行程內索引並釋放記憶體，之後寫入的向量也不再複製到索引中。
+        """
+        partition = self.partition(namespace)
+        if partition is None:
+            return
+        local_index = partition.local_index
+        if local_index is None or local_index.ready:
+            return
+        start = time.perf_counter()
+        table = partition.collection.table
+        with self.vx.Session() as session:
+            result = session.execute(
+                select(table.c.id, table.c.vec, table.c.metadata).execution_options(
+                    yield_per=batch_size
+                )
+            )
+            for rows in result.partitions():
+                local_index.upsert(rows)
+                if max_rows is not None and len(local_index) > max_rows:
+                    partition.local_index = None
+                    local_index.clear()
+                    print(
+                        f"[VectorDB] Collection {partition.name} exceeds {max_rows} "
+                        "rows, keep querying pgvector"
+                    )
+                    return
+        local_index.mark_ready()
+        print(
+            f"[VectorDB] Loaded {len(local_index)} vectors of {partition.name} into "
+            f"local index in {time.perf_counter() - start:.2f}s"
         )
-        vectors = []
-        for context in knowledge:
-            chunks = text_splitter.split_text(context)
-            # print(f"chunks: {chunks}")
-            for chunk in chunks:
-                embedding = embedding_model.encode(chunk).tolist()
-                vectors.append((str(uuid.uuid4()), embedding, {"text": chunk}))
-        self.collection.upsert(vectors)
-
-    def query(self, prompt, search_limit=10) -> list:
-        embedding_model = SentenceTransformer("DMetaSoul/sbert-chinese-general-v2")
-        query_embedding = embedding_model.encode(prompt).tolist()
-        results = self.collection.query(
+
+    @staticmethod
+    def chunk_id(chunk: str) -> str:
+        """
+        以內容 hash 作為 chunk id，相同內容重複寫入時只會對應到同一筆資料
+        """
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+    def existing_ids(self, ids: list, namespace: Optional[str] = None) -> set:
+        if not ids:
+            return set()
+        partition = self.partition(namespace)
+        if partition is None:
+            return set()
+        local_index = partition.ready_local_index()
+        if local_index is not None:
+            return {record_id for record_id in ids if record_id in local_index}
+        table = partition.collection.table
+        with self.vx.Session() as session:
+            rows = session.execute(select(table.c.id).where(table.c.id.in_(ids)))
+            return {row[0] for row in rows}
+
+    def _embed_chunks(self, chunks: list, ids: list, embedding_model) -> tuple:
+        """
+        取得 chunk 的 embedding，優先使用磁碟快取，只對未快取的 chunk 呼叫模型
+
+        Returns:
+            (embeddings, 快取命中筆數)
+        """
+        cached = self.embedding_cache.get_many(ids) if self.embedding_cache else {}
+        missing = [i for i, chunk_id in enumerate(ids) if chunk_id not in cached]
+        if missing:
+            encoded = embedding_model.encode(
+                [chunks[i] for i in missing], batch_size=self.encode_batch_size
+            )
+            new_embeddings = {ids[i]: vector for i, vector in zip(missing, encoded)}
+            if self.embedding_cache:
+                self.embedding_cache.put_many(new_embeddings)
+            cached.update(new_embeddings)
+        return [cached[chunk_id] for chunk_id in ids], len(ids) - len(missing)
+
+    def _flush(self, partition: VectorPartition, pending: list):
+        for start in range(0, len(pending), self.upsert_batch_size):
+            self._upsert(partition, pending[start : start + self.upsert_batch_size])
+
+    def insert_vectors(
+        self,
+        knowledge: Iterable[str],
+        embedding_model: Optional[EmbeddingBackend] = None,
+        skip_chunks: int = 0,
+        on_commit: Optional[Callable[[dict], None]] = None,
+        namespace: Optional[str] = None,
+        chunker: Optional[ParallelChunker] = None,
+    ) -> dict:
+        """
+        串流式寫入向量資料庫: 切割 -> 去除重複 -> 批次 embedding -> 分批 upsert
+
+        記憶體用量只與 encode_batch_size / upsert_batch_size 有關，與請求大小無關。
+        已存在於 collection (或同一次寫入中尚未 upsert) 的 chunk 不會重新 embedding 或 upsert。
+
+        Args:
+            skip_chunks: 略過前 N 個 chunk (從上次中斷的位置繼續)
+            on_commit: 每次 upsert 完成後呼叫，參數為目前的統計資料，
+                其中 committed_chunks 表示此位置之前的 chunk 都已寫入
+            namespace: 寫入的知識分區，None 為預設 collection
+            chunker: 提供時以多個行程切割文件，否則在目前的執行緒中切割
+
+        Returns:
+            dict -> {"chunks": 切割出的筆數, "inserted": 新寫入筆數,
+                     "skipped_duplicates": 略過的重複筆數,
+                     "embedding_cache_hits": 使用快取 embedding 的筆數,
+                     "seconds": 耗時, "chunks_per_second": 吞吐量,
+                     "stages": 各階段 (read / chunk / dedupe / embed / upsert) 的耗時與吞吐量}
+        """
+        embedding_model = embedding_model or self.embedding_model
+        partition = self.partition(namespace, create=True)
+        start = time.perf_counter()
+        total_chunks = inserted = skipped = cache_hits = 0
+        stage_stats = StageStats()
+        pending = []
+        pending_ids = set()
+
+        def current_stats() -> dict:
+            elapsed = time.perf_counter() - start
+            return {
+                "chunks": total_chunks,
+                "committed_chunks": skip_chunks + total_chunks,
+                "inserted": inserted,
+                "skipped_duplicates": skipped,
+                "embedding_cache_hits": cache_hits,
+                "seconds": round(elapsed, 3),
+                "chunks_per_second": round(total_chunks / elapsed, 2)
+                if elapsed
+                else 0.0,
+                "stages": stage_stats.to_dict(),
+            }
+
+        def flush():
+            with stage_stats.measure("upsert") as stage:
+                self._flush(partition, pending)
+                stage.items = len(pending)
+            pending.clear()
+            pending_ids.clear()
+
+        if chunker is not None:
+            chunks_iter = chunker.iter_chunks(knowledge, stage_stats)
+        else:
+            chunks_iter = stage_stats.timed("chunk", self.iter_chunks(knowledge))
+        chunk_stream = islice(chunks_iter, skip_chunks, None)
+        for batch in self.iter_batches(chunk_stream, self.encode_batch_size):
+            total_chunks += len(batch)
+            with stage_stats.measure("dedupe") as stage:
+                # 已 upsert 的 chunk 由 existing_ids 查出，不需保留整份文件的 id
+                chunks = {}
+                for chunk in batch:
+                    chunk_id = self.chunk_id(chunk)
+                    if chunk_id not in pending_ids:
+                        chunks[chunk_id] = chunk
+                existing = self.existing_ids(list(chunks), namespace)
+                ids = [chunk_id for chunk_id in chunks if chunk_id not in existing]
+                stage.items = len(batch)
+            skipped += len(batch) - len(ids)
+            if ids:
+                texts = [chunks[chunk_id] for chunk_id in ids]
+                with stage_stats.measure("embed") as stage:
+                    embeddings, hits = self._embed_chunks(texts, ids, embedding_model)
+                    stage.items = len(ids) - hits
+                cache_hits += hits
+                for chunk_id, chunk, embedding in zip(ids, texts, embeddings):
+                    pending.append((chunk_id, embedding.tolist(), {"text": chunk}))
+                pending_ids.update(ids)
+                inserted += len(ids)
+            if len(pending) >= self.upsert_batch_size:
+                flush()
+                if on_commit:
+                    on_commit(current_stats())
+            elif not pending and on_commit:
+                # 整批都是重複的 chunk 時也回報進度，讓佇列延長工作的租約
+                on_commit(current_stats())
+        if pending:
+            flush()
+        stats = current_stats()
+        if on_commit:
+            on_commit(stats)
+
+        print(
+            f"[VectorDB] Processed {stats['chunks']} chunks into {partition.name} "
+            f"({stats['inserted']} inserted, {stats['skipped_duplicates']} duplicates) "
+            f"in {stats['seconds']}s ({stats['chunks_per_second']} chunks/s)"
+        )
+        return stats
+
+    @staticmethod
+    def normalize_query(prompt: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", prompt).split()).lower()
+
+    def embed_query(self, prompt: str) -> list:
+        """
+        取得查詢向量，相同 (正規化後) 的查詢直接使用快取結果
+
+        正規化後的字串只作為快取鍵，encode 的仍是原始查詢，不改變模型看到的大小寫與標點。
+        """
+        key = self.normalize_query(prompt)
+        query_embedding = self.query_cache.get(key)
+        if query_embedding is None:
+            query_embedding = self.embedding_model.encode(prompt).tolist()
+            self.query_cache.set(key, query_embedding)
+        return query_embedding
+
+    def query(self, prompt, search_limit=10, namespace: Optional[str] = None) -> list:
+        """
+        只在 namespace 對應的分區中查詢，namespace 尚未寫入任何知識時回傳空結果
+        """
+        partition = self.partition(namespace)
+        if partition is None:
+            return []
+        query_embedding = self.embed_query(prompt)
+        local_index = partition.ready_local_index()
+        if local_index is not None:
+            return local_index.query(query_embedding, limit=search_limit)
+        return self.query_pgvector(query_embedding, search_limit, namespace)
+
+    def query_pgvector(
+        self, query_embedding: list, search_limit=10, namespace: Optional[str] = None
+    ) -> list:
+        partition = self.partition(namespace)
+        if partition is None:
+            return []
+        results = partition.collection.query(
             data=query_embedding,
             limit=search_limit,
             measure="cosine_distance",
             include_value=True,
             include_metadata=True,
+            ef_search=partition.settings.ef_search,
+            probes=partition.settings.probes,
         )
         return results
@@ -0,0 +1,121 @@
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from sentence_transformers import SentenceTransformer
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class EmbeddingBackend:
+    """
+    Embedding 模型的延遲載入包裝
+
+    第一次呼叫 encode() 或 warm_up() 時才載入模型，介面與 SentenceTransformer.encode 相同，
+    知識新增與查詢共用同一個實例。
+
+    backend:
+        torch: 原始 PyTorch 模型
+        onnx: ONNX Runtime (需安裝 sentence-transformers[onnx])
+        onnx-int8: ONNX Runtime + 動態 int8 量化，量化後的模型存於 onnx_cache_dir
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = "torch",
+        quantization: str = "avx2",
+        onnx_cache_dir: str = "models/onnx",
+    ):
+        if backend not in SUPPORTED_BACKENDS:
+            raise ValueError(
+                f"Unsupported embedding backend: {backend}, "
+                f"expected one of {SUPPORTED_BACKENDS}"
+            )
+        self.model_name = model_name
+        self.backend = backend
+        self.quantization = quantization
+        self.onnx_cache_dir = Path(onnx_cache_dir)
+        self.load_seconds: Optional[float] = None
+        self._model: Optional[SentenceTransformer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self) -> str:
+        """
+        不同 backend 產生的向量略有差異，embedding 快取需分開儲存
+        """
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}:{self.backend}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @staticmethod
+    def _require_onnx():
+        try:
+            import onnxruntime  # noqa: F401
+            import optimum  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "ONNX embedding backend requires `uv pip install sentence-transformers[onnx]`"
+            ) from e
+
+    def _load_onnx_int8(self) -> SentenceTransformer:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        local_dir = self.onnx_cache_dir / self.model_name.replace("/", "__")
+        file_name = f"onnx/model_qint8_{self.quantization}.onnx"
+        if not (local_dir / file_name).exists():
+            print(f"[EmbeddingBackend] Quantizing {self.model_name} to {local_dir}")
+            model = SentenceTransformer(self.model_name, backend="onnx")
+            model.save(str(local_dir))
+            export_dynamic_quantized_onnx_model(
+                model, self.quantization, str(local_dir)
+            )
+        return SentenceTransformer(
+            str(local_dir), backend="onnx", model_kwargs={"file_name": file_name}
+        )
+
+    def _load(self) -> SentenceTransformer:
+        if self.backend == "torch":
+            return SentenceTransformer(self.model_name)
+        self._require_onnx()
+        if self.backend == "onnx":
+            return SentenceTransformer(self.model_name, backend="onnx")
+        return self._load_onnx_int8()
+
+    def load(self) -> SentenceTransformer:
+        """
+        只載入模型權重 (不執行 encode)，已載入時直接回傳
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._load()
+                    self.load_seconds = time.perf_counter() - start
+                    print(
+                        f"[EmbeddingBackend] Loaded {self.model_name} ({self.backend}) "
+                        f"in {self.load_seconds:.2f}s"
+                    )
+        return self._model
+
+    @property
+    def model(self) -> SentenceTransformer:
+        return self.load()
+
+    def warm_up(self):
+        """
+        載入模型並執行一次 encode，讓第一個請求不需等待模型載入
+        """
+        self.model.encode(["warm up"])
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs):
+        return self.model.encode(sentences, batch_size=batch_size, **kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
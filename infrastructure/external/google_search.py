@@ -1,25 +1,98 @@
-import requests
+import asyncio
+from typing import Optional
+
+from infrastructure.external.search_result_cache import SearchResultCache
+from infrastructure.http.http_client import AsyncHttpClient, HttpClient
 
 
 class GoogleSearch:
-    def __init__(self, api_key: str, search_engine_id: str):
+    url = "https://www.googleapis.com/customsearch/v1"
+
+    def __init__(
+        self,
+        api_key: str,
+        search_engine_id: str,
+        http_client: Optional[HttpClient] = None,
+        async_http_client: Optional[AsyncHttpClient] = None,
+        cache: Optional[SearchResultCache] = None,
+    ):
         self.api_key = api_key
         self.search_engine_id = search_engine_id
+        self.http_client = http_client or HttpClient()
+        self.async_http_client = async_http_client or AsyncHttpClient()
+        self.cache = cache
+
+    def _params(self, query: str) -> dict:
+        return {"key": self.api_key, "cx": self.search_engine_id, "q": query}
+
+    @staticmethod
+    def _format_results(data: dict, max_results: int) -> list:
+        results = data.get("items", [])
+        formattedResults = []
+        for item in results[:max_results]:
+            formattedResults.append(
+                {"title": item.get("title", ""), "snippet": item.get("snippet", "")}
+            )
+        return formattedResults
+
+    def _cached(self, query: str, max_results: int) -> tuple:
+        """
+        Returns:
+            (新鮮的快取結果或 None, 過期但可備用的結果或 None)
+        """
+        if not self.cache:
+            return None, None
+        cached = self.cache.get(query, max_results)
+        if cached is None:
+            return None, None
+        results, is_fresh = cached
+        return (results, None) if is_fresh else (None, results)
+
+    def _fallback(self, stale_results: Optional[list], error: Exception) -> list:
+        # 查詢失敗 (例如 429 rate limit) 時不寫入快取，改回傳上次成功的結果
+        print(f"Error during Google Search: {error}")
+        if stale_results is not None:
+            self.cache.record_stale_hit()
+            print("[GoogleSearch] Serving stale cached results")
+            return stale_results
+        return []
 
     def search(self, query: str, max_results=5) -> list:
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {"key": self.api_key, "cx": self.search_engine_id, "q": query}
+        if not query:
+            return []
+        fresh_results, stale_results = self._cached(query, max_results)
+        if fresh_results is not None:
+            return fresh_results
         try:
-            response = requests.get(url, params=params)
+            response = self.http_client.get(self.url, params=self._params(query))
             response.raise_for_status()
-            results = response.json().get("items", [])
-            formattedResults = []
-            for item in results[:max_results]:
-                formattedResults.append(
-                    {"title": item.get("title", ""), "snippet": item.get("snippet", "")}
-                )
-            return formattedResults
-
+            results = self._format_results(response.json(), max_results)
         except Exception as e:
-            print(f"Error during Google Search: {e}")
+            return self._fallback(stale_results, e)
+        if self.cache:
+            self.cache.set(query, max_results, results)
+        return results
+
+    async def search_async(self, query: str, max_results=5) -> list:
+        if not query:
             return []
+        if self.cache and self.cache.db_path:
+            # 記憶體層未命中時會讀取 SQLite，不在 event loop 上執行
+            fresh_results, stale_results = await asyncio.to_thread(
+                self._cached, query, max_results
+            )
+        else:
+            fresh_results, stale_results = self._cached(query, max_results)
+        if fresh_results is not None:
+            return fresh_results
+        try:
+            response = await self.async_http_client.get(
+                self.url, params=self._params(query)
+            )
+            response.raise_for_status()
+            results = self._format_results(response.json(), max_results)
+        except Exception as e:
+            return self._fallback(stale_results, e)
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, query, max_results, results)
+        return results
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from infrastructure.cache.lru_cache import LRUCache
+
+
+class SearchResultCache:
+    """
+    Google 搜尋結果快取
+
+    - 記憶體層: LRU，保留到 stale_ttl 為止
+    - 持久層 (可選): SQLite，重啟後仍可使用，超過 db_max_entries 筆時定期刪除最舊的結果
+    超過 ttl 的結果視為過期 (stale)，只在重新查詢失敗時才會使用。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400,
+        stale_ttl: float = 7 * 86400,
+        max_entries: int = 1000,
+        db_path: Optional[str] = None,
+        db_max_entries: int = 100000,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.memory = LRUCache(max_size=max_entries, ttl=self.stale_ttl)
+        self.db_path = db_path
+        self.db_max_entries = max(db_max_entries, 1)
+        # 每寫入 _prune_interval 筆檢查一次筆數，避免每次寫入都掃描資料表
+        self._prune_interval = max(self.db_max_entries // 10, 1)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._local = threading.local()
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS search_cache (
+                        key TEXT PRIMARY KEY,
+                        results TEXT NOT NULL,
+                        fetched_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS search_cache_fetched_at "
+                    "ON search_cache (fetched_at)"
+                )
+            self._prune()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        normalized = " ".join(unicodedata.normalize("NFKC", query).split()).lower()
+        return f"{max_results}:{normalized}"
+
+    def get(self, query: str, max_results: int) -> Optional[tuple]:
+        """
+        Returns:
+            (results, is_fresh)，沒有可用的結果時回傳 None
+        """
+        key = self.make_key(query, max_results)
+        entry = self.memory.get(key)
+        if entry is None and self.db_path:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT results, fetched_at FROM search_cache WHERE key = ?",
+                    (key,),
+                )
+                .fetchone()
+            )
+            if row and row[1] > time.time() - self.stale_ttl:
+                entry = {"results": json.loads(row[0]), "fetched_at": row[1]}
+                self.memory.set(key, entry)
+        is_fresh = entry is not None and time.time() - entry["fetched_at"] < self.ttl
+        if is_fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if entry is None:
+            return None
+        return entry["results"], is_fresh
+
+    def set(self, query: str, max_results: int, results: list):
+        key = self.make_key(query, max_results)
+        entry = {"results": results, "fetched_at": time.time()}
+        self.memory.set(key, entry)
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, results, fetched_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(results, ensure_ascii=False), entry["fetched_at"]),
+                )
+            with self._writes_lock:
+                self._writes += 1
+                should_prune = self._writes % self._prune_interval == 0
+            if should_prune:
+                self._prune()
+
+    def _prune(self):
+        """
+        刪除超過 stale_ttl 的結果，並只保留最新的 db_max_entries 筆
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM search_cache WHERE fetched_at <= ?",
+                (time.time() - self.stale_ttl,),
+            )
+            conn.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "SELECT key FROM search_cache ORDER BY fetched_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.db_max_entries,),
+            )
+
+    def record_stale_hit(self):
+        self.stale_hits += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,252 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After (秒數或 HTTP 日期) 為等待秒數，無法解析時回傳 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_date.timestamp() - time.time(), 0.0)
+
+
+class CappedRetry(Retry):
+    """
+    Retry-After 超過 max_retry_after 秒時不再等待重試，直接回傳該回應
+    """
+
+    def __init__(self, *args, max_retry_after: float = 30.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        kwargs.setdefault("max_retry_after", self.max_retry_after)
+        return super().new(**kwargs)
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        if response is not None and self.respect_retry_after_header:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # raise_on_status=False 時 urllib3 會回傳這個回應而不是拋出例外
+                raise MaxRetryError(
+                    kwargs.get("_pool"),
+                    url,
+                    ResponseError(f"Retry-After {retry_after:.0f}s is too long"),
+                )
+        return super().increment(method, url, response, *args, **kwargs)
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    在建立新連線時記錄到 HttpClientMetrics，連線池被淘汰後統計也不會減少
+    """
+
+    def __init__(self, metrics: "HttpClientMetrics", **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        metrics = self.metrics
+
+        def counting(pool_class):
+            class CountingConnectionPool(pool_class):
+                def _new_conn(self):
+                    metrics.record_connection()
+                    return super()._new_conn()
+
+            return CountingConnectionPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class HttpClientMetrics:
+    """
+    HTTP 連線與重試統計
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+    def record(self, requests: int = 0, retries: int = 0, failures: int = 0):
+        with self._lock:
+            self.requests += requests
+            self.retries += retries
+            self.failures += failures
+
+    def record_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": max(self.requests - self.new_connections, 0),
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+class HttpClient:
+    """
+    共用的同步 HTTP client
+
+    - requests.Session 保持 keep-alive，每個 host 最多 pool_maxsize 條連線
+    - 連線 / 讀取 timeout
+    - 429 與 5xx 以指數退避重試 (僅限 idempotent method)，
+      Retry-After 超過 max_retry_after 秒時不重試，直接回傳該回應
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_maxsize: int = 20,
+        max_retry_after: float = 30.0,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.metrics = HttpClientMetrics()
+        self.adapter = CountingHTTPAdapter(
+            self.metrics,
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=CappedRetry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=IDEMPOTENT_METHODS,
+                raise_on_status=False,
+                respect_retry_after_header=True,
+                max_retry_after=max_retry_after,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self.metrics.record(requests=1, failures=1)
+            raise
+        retries = getattr(response.raw, "retries", None)
+        self.metrics.record(requests=1, retries=len(retries.history) if retries else 0)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> dict:
+        return self.metrics.stats()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """
+    共用的非同步 HTTP client (httpx.AsyncClient)，重試與 timeout 規則同 HttpClient
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_maxsize: int = 20,
+        max_retry_after: float = 30.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_after = max_retry_after
+        self.metrics = HttpClientMetrics()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            ),
+        )
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics.record_connection()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_factor * (2**attempt) * (0.5 + random.random())
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        retryable = method.upper() in IDEMPOTENT_METHODS
+        extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(
+                    method, url, extensions=extensions, **kwargs
+                )
+            except httpx.TransportError:
+                if not retryable or attempt >= self.max_retries:
+                    self.metrics.record(requests=1, retries=attempt, failures=1)
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if (
+                response.status_code in RETRY_STATUS_CODES
+                and retryable
+                and attempt < self.max_retries
+            ):
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                # 上游要求等待超過 max_retry_after 時不再重試，直接回傳該回應
+                if retry_after is None or retry_after <= self.max_retry_after:
+                    await response.aclose()
+                    await asyncio.sleep(
+                        self._backoff(attempt) if retry_after is None else retry_after
+                    )
+                    attempt += 1
+                    continue
+            self.metrics.record(requests=1, retries=attempt)
+            return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def stats(self) -> dict:
+        return self.metrics.stats()
+
+    async def aclose(self):
+        await self.client.aclose()
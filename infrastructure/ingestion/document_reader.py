@@ -0,0 +1,126 @@
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+SUPPORTED_FORMATS = ("txt", "md", "jsonl")
+
+_CONTENT_TYPES = {
+    "text/plain": "txt",
+    "text/markdown": "md",
+    "text/x-markdown": "md",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+    "application/x-jsonlines": "jsonl",
+}
+_EXTENSIONS = {".txt": "txt", ".md": "md", ".markdown": "md", ".jsonl": "jsonl"}
+
+
+class ReadProgress:
+    """
+    記錄讀取文件時已讀過的位元組數，用來回報工作進度 (不需事先切割整份檔案計算總數)
+    """
+
+    def __init__(self):
+        self.bytes_read = 0
+
+
+def detect_format(
+    filename: Optional[str] = None, content_type: Optional[str] = None
+) -> Optional[str]:
+    """
+    依副檔名或 Content-Type 判斷檔案格式，無法判斷時回傳 None
+    """
+    if filename:
+        source_format = _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if source_format:
+            return source_format
+    if content_type:
+        return _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def iter_text_documents(
+    path: str,
+    max_chars: int = 20000,
+    markdown: bool = False,
+    progress: Optional[ReadProgress] = None,
+) -> Iterator[str]:
+    """
+    逐行讀取純文字 / Markdown 檔，以段落 (空行) 為界累積到 max_chars 後產出一份文件
+
+    Markdown 另外在每個標題前切開；沒有空行的長文字最多累積 2 * max_chars。
+    """
+    buffer, size = [], 0
+    progress = progress or ReadProgress()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        # 限制單次讀取長度，沒有換行的超長內容也不會一次讀進記憶體
+        for line in iter(lambda: f.readline(max_chars), ""):
+            is_heading = markdown and line.startswith("#")
+            if buffer and (
+                is_heading
+                or (size >= max_chars and not line.strip())
+                or size >= max_chars * 2
+            ):
+                document = "".join(buffer)
+                if document.strip():
+                    progress.bytes_read = f.buffer.tell()
+                    yield document
+                buffer, size = [], 0
+            buffer.append(line)
+            size += len(line)
+        progress.bytes_read = f.buffer.tell()
+    document = "".join(buffer)
+    if document.strip():
+        yield document
+
+
+def iter_jsonl_documents(
+    path: str, progress: Optional[ReadProgress] = None
+) -> Iterator[str]:
+    """
+    逐行讀取 JSONL，每行可以是字串或含有 content (或 text) 欄位的物件
+    """
+    progress = progress or ReadProgress()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_number, line in enumerate(f, 1):
+            # tell() 需要一次系統呼叫，每 256 行更新一次已足夠回報進度
+            if line_number % 256 == 0:
+                progress.bytes_read = f.buffer.tell()
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}") from None
+            if isinstance(record, dict):
+                record = record.get("content") or record.get("text")
+            if isinstance(record, str) and record.strip():
+                yield record
+        progress.bytes_read = f.buffer.tell()
+
+
+def iter_list_documents(
+    documents: Iterable[str], progress: Optional[ReadProgress] = None
+) -> Iterator[str]:
+    """
+    逐篇產出已在記憶體中的文件，以 UTF-8 位元組數記錄進度
+    """
+    progress = progress or ReadProgress()
+    for document in documents:
+        progress.bytes_read += len(document.encode("utf-8"))
+        yield document
+
+
+def iter_documents(
+    path: str,
+    source_format: str,
+    max_chars: int = 20000,
+    progress: Optional[ReadProgress] = None,
+):
+    if source_format == "jsonl":
+        return iter_jsonl_documents(path, progress)
+    if source_format in ("txt", "md"):
+        return iter_text_documents(
+            path, max_chars, markdown=source_format == "md", progress=progress
+        )
+    raise ValueError(f"Unsupported knowledge file format: {source_format}")
@@ -0,0 +1,102 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from infrastructure.metrics.stage_stats import StageStats
+
+
+def create_text_splitter() -> RecursiveCharacterTextSplitter:
+    """
+    知識庫使用的切割設定，VectorDB 與 ParallelChunker 的子行程共用
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=100, chunk_overlap=20, separators=["\n", "。", "！", "？", "，"]
+    )
+
+
+_splitter: Optional[RecursiveCharacterTextSplitter] = None
+
+
+def _split_documents(documents: List[str]) -> List[str]:
+    # 在子行程中執行，每個子行程只建立一次 splitter
+    global _splitter
+    if _splitter is None:
+        _splitter = create_text_splitter()
+    return [chunk for document in documents for chunk in _splitter.split_text(document)]
+
+
+class ParallelChunker:
+    """
+    以多個行程切割文件
+
+    文件依 batch_chars 分組後送往 process pool，最多同時有 max_pending 組在處理，
+    記憶體用量與檔案大小無關；結果依原本的順序產出，因此仍可由 committed_chunks 位置繼續。
+    子行程以 spawn 建立，避免 fork 複製服務中的執行緒與連線。
+    """
+
+    def __init__(
+        self,
+        processes: int = 2,
+        batch_chars: int = 200_000,
+        max_pending: Optional[int] = None,
+    ):
+        self.processes = processes
+        self.batch_chars = batch_chars
+        self.max_pending = max_pending or processes * 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _iter_batches(
+        self, documents: Iterable[str], stage_stats: StageStats
+    ) -> Iterator[List[str]]:
+        batch, size = [], 0
+        for document in stage_stats.timed("read", documents):
+            batch.append(document)
+            size += len(document)
+            if size >= self.batch_chars:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _collect(future: Future, stage_stats: StageStats) -> List[str]:
+        with stage_stats.measure("chunk") as stage:
+            chunks = future.result()
+            stage.items = len(chunks)
+        return chunks
+
+    def iter_chunks(
+        self, documents: Iterable[str], stage_stats: Optional[StageStats] = None
+    ) -> Iterator[str]:
+        """
+        依序產出所有文件的 chunk，讀取文件與等待切割結果的時間分別計入 read / chunk 階段
+        """
+        stage_stats = stage_stats or StageStats()
+        executor = self._get_executor()
+        pending: Deque[Future] = deque()
+        for batch in self._iter_batches(documents, stage_stats):
+            pending.append(executor.submit(_split_documents, batch))
+            if len(pending) >= self.max_pending:
+                yield from self._collect(pending.popleft(), stage_stats)
+        while pending:
+            yield from self._collect(pending.popleft(), stage_stats)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
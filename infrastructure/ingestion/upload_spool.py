@@ -0,0 +1,47 @@
+import asyncio
+import os
+import uuid
+from typing import AsyncIterator, Tuple
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+async def spool_upload(
+    stream: AsyncIterator[bytes],
+    directory: str,
+    suffix: str = "",
+    max_bytes: int = 0,
+    buffer_size: int = 1 << 20,
+) -> Tuple[str, int]:
+    """
+    將上傳內容以串流方式寫入 directory 中的暫存檔，記憶體中最多保留 buffer_size 位元組
+
+    超過 max_bytes (0 表示不限制) 時刪除暫存檔並拋出 UploadTooLargeError。
+
+    Returns:
+        (暫存檔路徑, 位元組數)
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}{suffix}")
+    f = await asyncio.to_thread(open, path, "wb")
+    size = 0
+    buffer = bytearray()
+    try:
+        async for data in stream:
+            size += len(data)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            buffer += data
+            if len(buffer) >= buffer_size:
+                await asyncio.to_thread(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(f.write, bytes(buffer))
+        await asyncio.to_thread(f.close)
+    except BaseException:
+        f.close()
+        os.remove(path)
+        raise
+    return path, size
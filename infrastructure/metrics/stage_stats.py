@@ -0,0 +1,57 @@
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterable, Iterator, List
+
+
+class StageStats:
+    """
+    記錄批次處理流程中各階段 (例如讀取、切割、embedding、upsert) 的耗時與處理筆數
+
+    seconds 為主流程花在該階段的時間，items_per_second 可看出哪個階段是瓶頸。
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float, items: int = 0):
+        stage = self._stages.setdefault(name, [0.0, 0])
+        stage[0] += seconds
+        stage[1] += items
+
+    @contextmanager
+    def measure(self, name: str):
+        """
+        計入 with 區塊的耗時，處理筆數可在區塊中設定 stage.items
+        """
+        stage = SimpleNamespace(items=0)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            self.add(name, time.perf_counter() - start, stage.items)
+
+    def timed(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        逐一取出 iterable 的元素，並將取出所花的時間計入 name 階段
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start, 1)
+            yield item
+
+    def to_dict(self) -> dict:
+        return {
+            name: {
+                "seconds": round(seconds, 3),
+                "items": int(items),
+                "items_per_second": round(items / seconds, 2) if seconds else 0.0,
+            }
+            for name, (seconds, items) in self._stages.items()
+        }
@@ -0,0 +1,274 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+
+class LeaseLostError(RuntimeError):
+    """
+    工作的租約已到期並被其他 worker 取走，目前的 worker 應停止處理
+    """
+
+
+class IngestionQueue:
+    """
+    以 SQLite 保存的知識新增工作佇列
+
+    工作內容與進度 (已寫入的 chunk 位置) 都會寫入磁碟，
+    服務重啟後未完成的工作會重新排入佇列，並從最後一次寫入的位置繼續。
+    上傳的檔案只記錄暫存檔路徑 (source_path)，內容由 worker 逐段讀取。
+    執行中的進度以已讀取的位元組數 (read_bytes / total_bytes) 表示，總 chunk 數在完成時才寫入。
+
+    取出的工作會設定租約 (lease)，每次回報進度時延長；worker 中斷而租約到期後，
+    工作才會再次被取出，其他行程中仍在執行的工作不會被重複處理。
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    knowledge TEXT NOT NULL,
+                    namespace TEXT,
+                    source_path TEXT,
+                    source_format TEXT,
+                    stages TEXT,
+                    total_chunks INTEGER,
+                    total_bytes INTEGER,
+                    read_bytes INTEGER NOT NULL DEFAULT 0,
+                    committed_chunks INTEGER NOT NULL DEFAULT 0,
+                    inserted INTEGER NOT NULL DEFAULT 0,
+                    skipped_duplicates INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_until REAL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                )
+                """
+            )
+            columns = {
+                row["name"] for row in conn.execute("PRAGMA table_info(ingestion_jobs)")
+            }
+            # 舊版資料庫缺少的欄位，既有工作的 namespace 為 NULL (寫入預設分區)
+            for column, column_type in (
+                ("namespace", "TEXT"),
+                ("source_path", "TEXT"),
+                ("source_format", "TEXT"),
+                ("stages", "TEXT"),
+                ("lease_owner", "TEXT"),
+                ("lease_until", "REAL"),
+                ("total_bytes", "INTEGER"),
+                ("read_bytes", "INTEGER NOT NULL DEFAULT 0"),
+            ):
+                if column not in columns:
+                    conn.execute(
+                        f"ALTER TABLE ingestion_jobs ADD COLUMN {column} {column_type}"
+                    )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status "
+                "ON ingestion_jobs (status, created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, knowledge: List[str], namespace: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        total_bytes = sum(len(document.encode("utf-8")) for document in knowledge)
+        self._connect().execute(
+            "INSERT INTO ingestion_jobs (job_id, status, knowledge, namespace, "
+            "total_bytes, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (
+                job_id,
+                json.dumps(knowledge, ensure_ascii=False),
+                namespace,
+                total_bytes,
+                now,
+                now,
+            ),
+        )
+        return job_id
+
+    def enqueue_file(
+        self,
+        source_path: str,
+        source_format: str,
+        namespace: Optional[str] = None,
+        total_bytes: Optional[int] = None,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO ingestion_jobs (job_id, status, knowledge, namespace, "
+            "source_path, source_format, total_bytes, created_at, updated_at) "
+            "VALUES (?, 'queued', '[]', ?, ?, ?, ?, ?, ?)",
+            (job_id, namespace, source_path, source_format, total_bytes, now, now),
+        )
+        return job_id
+
+    def requeue_interrupted(self) -> int:
+        """
+        將租約已到期 (執行中的 worker 已中斷) 的工作重新排入佇列
+
+        其他 worker / 行程仍在執行、租約未到期的工作不受影響。
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE ingestion_jobs SET status = 'queued', lease_owner = NULL, "
+            "lease_until = NULL, updated_at = ? "
+            "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+            (now, now),
+        )
+        return cursor.rowcount
+
+    def claim_next(self) -> Optional[dict]:
+        """
+        取出最早排入 (或租約已到期) 的工作並標記為 running，
+        多個 worker / 行程同時呼叫也只會有一個取得
+
+        回傳的 lease_owner 需在回報進度與結果時帶入，用來確認租約仍屬於目前的 worker。
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            lease_owner = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE ingestion_jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_owner = ?, lease_until = ?, "
+                "started_at = COALESCE(started_at, ?), updated_at = ? WHERE job_id = ?",
+                (lease_owner, now + self.lease_seconds, now, now, row["job_id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["knowledge"] = json.loads(job["knowledge"])
+        job["lease_owner"] = lease_owner
+        return job
+
+    def _update_leased(self, job_id: str, lease_owner: str, assignments: str, params):
+        cursor = self._connect().execute(
+            f"UPDATE ingestion_jobs SET {assignments}, updated_at = ? "
+            "WHERE job_id = ? AND lease_owner = ?",
+            (*params, time.time(), job_id, lease_owner),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Lease on ingestion job {job_id} was lost")
+
+    def set_total(self, job_id: str, lease_owner: str, total_chunks: int):
+        self._update_leased(job_id, lease_owner, "total_chunks = ?", (total_chunks,))
+
+    def commit_progress(
+        self,
+        job_id: str,
+        lease_owner: str,
+        committed_chunks: int,
+        inserted: int,
+        skipped: int,
+        stages: Optional[dict] = None,
+        read_bytes: Optional[int] = None,
+    ):
+        """
+        記錄已寫入向量資料庫的 chunk 位置，重試時從此位置繼續
+
+        stages 為這次執行各階段的耗時與吞吐量 (見 VectorDB.insert_vectors)，
+        read_bytes 為目前已讀取的來源位元組數。
+        同時延長租約 (heartbeat)；租約已被其他 worker 取走時拋出 LeaseLostError。
+        """
+        self._update_leased(
+            job_id,
+            lease_owner,
+            "committed_chunks = ?, inserted = ?, skipped_duplicates = ?, "
+            "stages = COALESCE(?, stages), read_bytes = COALESCE(?, read_bytes), "
+            "lease_until = ?",
+            (
+                committed_chunks,
+                inserted,
+                skipped,
+                json.dumps(stages) if stages is not None else None,
+                read_bytes,
+                time.time() + self.lease_seconds,
+            ),
+        )
+
+    def requeue(self, job_id: str, lease_owner: str, error: str):
+        self._update_leased(
+            job_id,
+            lease_owner,
+            "status = 'queued', error = ?, lease_owner = NULL, lease_until = NULL",
+            (error,),
+        )
+
+    def finish(
+        self, job_id: str, lease_owner: str, status: str, error: Optional[str] = None
+    ):
+        self._update_leased(
+            job_id,
+            lease_owner,
+            "status = ?, error = ?, finished_at = ?, lease_owner = NULL, "
+            "lease_until = NULL",
+            (status, error, time.time()),
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT job_id, status, namespace, source_format, total_chunks, "
+                "total_bytes, read_bytes, committed_chunks, inserted, "
+                "skipped_duplicates, attempts, error, stages, created_at, started_at, "
+                "updated_at, finished_at "
+                "FROM ingestion_jobs WHERE job_id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"]) if job["stages"] else None
+        elapsed = (job["finished_at"] or time.time()) - (job["started_at"] or 0)
+        job["chunks_per_second"] = (
+            round(job["committed_chunks"] / elapsed, 2)
+            if job["started_at"] and elapsed > 0
+            else 0.0
+        )
+        if job["status"] == "completed":
+            job["progress"] = 1.0
+        elif job["total_bytes"]:
+            # 讀取會比寫入稍微超前，完成前最多顯示 0.99
+            job["progress"] = min(
+                round(job["read_bytes"] / job["total_bytes"], 4), 0.99
+            )
+        else:
+            job["progress"] = 0.0
+        return job
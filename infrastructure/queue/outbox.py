@@ -0,0 +1,192 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+
+class Outbox:
+    """
+    以 SQLite 保存、待送往 Web API 的請求 (transactional outbox)
+
+    生成結果先寫入磁碟再由背景 dispatcher 傳送，Web API 暫時無法連線或服務重啟都不會遺失。
+    每筆訊息的 message_id 同時作為 Idempotency-Key，重送時 Web API 可據此去除重複。
+
+    取出的訊息會設定租約 (lease)，dispatcher 中斷而未回報結果時，租約到期後會再次被取出。
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 60.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox_messages (
+                    message_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    delivered_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_messages_status "
+                "ON outbox_messages (status, next_attempt_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, method: str, endpoint: str, payload: dict) -> str:
+        message_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO outbox_messages (message_id, status, method, endpoint, payload, "
+            "created_at, next_attempt_at, updated_at) "
+            "VALUES (?, 'pending', ?, ?, ?, ?, ?, ?)",
+            (
+                message_id,
+                method,
+                endpoint,
+                json.dumps(payload, ensure_ascii=False),
+                now,
+                now,
+                now,
+            ),
+        )
+        return message_id
+
+    def claim_batch(self, limit: int) -> List[dict]:
+        """
+        取出最多 limit 筆已到重送時間的訊息並設定租約，多個 worker / 行程同時呼叫也不會重複取得
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM outbox_messages "
+                "WHERE status IN ('pending', 'delivering') AND next_attempt_at <= ? "
+                "ORDER BY created_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox_messages SET status = 'delivering', "
+                "attempts = attempts + 1, next_attempt_at = ?, updated_at = ? "
+                "WHERE message_id = ?",
+                [(now + self.lease_seconds, now, row["message_id"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        messages = []
+        for row in rows:
+            message = dict(row)
+            message["payload"] = json.loads(message["payload"])
+            message["attempts"] += 1
+            messages.append(message)
+        return messages
+
+    def mark_delivered(self, message_ids: List[str], status: str = "delivered"):
+        """
+        status 為 superseded 表示同一個資源已有較新的內容送出，這筆不需要再送
+        """
+        now = time.time()
+        self._connect().executemany(
+            "UPDATE outbox_messages SET status = ?, error = NULL, "
+            "delivered_at = ?, updated_at = ? WHERE message_id = ?",
+            [(status, now, now, message_id) for message_id in message_ids],
+        )
+
+    def retry_later(self, message_id: str, error: str, delay: float):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE outbox_messages SET status = 'pending', error = ?, "
+            "next_attempt_at = ?, updated_at = ? WHERE message_id = ?",
+            (error, now + delay, now, message_id),
+        )
+
+    def mark_failed(self, message_id: str, error: str):
+        self._connect().execute(
+            "UPDATE outbox_messages SET status = 'failed', error = ?, updated_at = ? "
+            "WHERE message_id = ?",
+            (error, time.time(), message_id),
+        )
+
+    def purge_delivered(self, older_than: float) -> int:
+        """
+        刪除 older_than 秒以前已送達的訊息
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM outbox_messages WHERE status IN ('delivered', 'superseded') "
+            "AND delivered_at < ?",
+            (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def next_due_in(self) -> Optional[float]:
+        """
+        距離下一筆訊息可傳送的秒數，沒有待送訊息時回傳 None
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT MIN(next_attempt_at) FROM outbox_messages "
+                "WHERE status IN ('pending', 'delivering')"
+            )
+            .fetchone()
+        )
+        if row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0.0)
+
+    def get(self, message_id: str) -> Optional[dict]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT message_id, status, method, endpoint, attempts, error, "
+                "created_at, updated_at, delivered_at "
+                "FROM outbox_messages WHERE message_id = ?",
+                (message_id,),
+            )
+            .fetchone()
+        )
+        return dict(row) if row else None
+
+    def stats(self) -> dict:
+        rows = (
+            self._connect()
+            .execute("SELECT status, COUNT(*) FROM outbox_messages GROUP BY status")
+            .fetchall()
+        )
+        counts = {row[0]: row[1] for row in rows}
+        oldest = (
+            self._connect()
+            .execute(
+                "SELECT MIN(created_at) FROM outbox_messages "
+                "WHERE status IN ('pending', 'delivering')"
+            )
+            .fetchone()[0]
+        )
+        return {
+            "pending": counts.get("pending", 0) + counts.get("delivering", 0),
+            "failed": counts.get("failed", 0),
+            "delivered": counts.get("delivered", 0) + counts.get("superseded", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 3) if oldest else 0,
+        }
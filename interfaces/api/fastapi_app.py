@@ -1,8 +1,18 @@
+import asyncio
 import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from application.dto.course import CourseResponse
+from application.dto.course_chapters import CourseChaptersRequest
 from application.dto.course_content import CourseContentRequest, CourseContentResponse
 from application.dto.knowledge import KnowledgeRequest
 from application.dto.user_feedback import UserFeedbackRequest
@@ -10,13 +20,31 @@ from application.dto.user_question import UserQuestionRequest
 from application.use_cases.create_user_temp import CreateUserTempUseCase
 from application.use_cases.generate_chapter_content import GenerateChapterContentUseCase
 from application.use_cases.generate_course import GenerateCourseUseCase
+from application.use_cases.generate_course_chapters import (
+    GenerateCourseChaptersUseCase,
+)
 from application.use_cases.generate_questions import GenerateQuestionsUseCase
+from application.use_cases.ingestion_worker import IngestionWorkerPool
 from application.use_cases.insert_knowledge import InsertKnowledgeUseCase
+from application.use_cases.json_stream import JsonStringFieldStreamDecoder
+from application.use_cases.outbox_dispatcher import OutboxDispatcher
+from application.use_cases.prompt_loader import get_prompt_registry
+from domain.models.knowledge import NAMESPACE_PATTERN
 from domain.services.api_request_service import APIRequest
+from domain.services.gemini_errors import GeminiOverloadedError, GeminiServiceError
 from domain.services.gemini_service import GeminiService
+from domain.services.generation_profile import ModelRouter
+from domain.services.session_store import SessionNotFoundError, SessionStore
 from infrastructure.config import Config
+from infrastructure.db.local_vector_index import LocalVectorIndex
 from infrastructure.db.vector_db import VectorDB
+from infrastructure.embedding.embedding_backend import EmbeddingBackend
 from infrastructure.external.google_search import GoogleSearch
+from infrastructure.ingestion.document_reader import detect_format
+from infrastructure.ingestion.upload_spool import UploadTooLargeError, spool_upload
+from infrastructure.metrics.metrics import end_trace, get_metrics_registry, start_trace
+from infrastructure.queue.ingestion_queue import IngestionQueue
+from infrastructure.queue.outbox import Outbox
 
 tags_metadata = [
     {"name": "知識庫模組", "description": "RAG 知識庫相關 API"},
@@ -24,62 +52,349 @@ tags_metadata = [
 ]
 
 
-def create_app() -> FastAPI:
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def create_app(
+    gemini_client=None,
+    google_search: Optional[GoogleSearch] = None,
+    vector_db: Optional[VectorDB] = None,
+    api_request_service: Optional[APIRequest] = None,
+    session_store: Optional[SessionStore] = None,
+    ingestion_queue: Optional[IngestionQueue] = None,
+    outbox: Optional[Outbox] = None,
+    embedding_model: Optional[EmbeddingBackend] = None,
+) -> FastAPI:
+    """
+    建立 FastAPI 應用程式
+
+    外部服務皆可由參數注入 (例如 benchmarks/fakes.py 的替身)，未提供時依 Config 建立。
+    prefork 模式下 embedding_model 由主行程預先載入後傳入，各 worker 共用同一份記憶體分頁。
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # asyncio.to_thread 與 FastAPI 同步路由使用的執行緒數量
+        executor = ThreadPoolExecutor(
+            max_workers=config.THREADPOOL_SIZE, thread_name_prefix="app-thread"
+        )
+        asyncio.get_running_loop().set_default_executor(executor)
+        anyio.to_thread.current_default_thread_limiter().total_tokens = (
+            config.THREADPOOL_SIZE
+        )
+        ingestion_workers.start()
+        outbox_dispatcher.start()
+        yield
+        await outbox_dispatcher.stop()
+        await asyncio.to_thread(ingestion_workers.stop)
+        if chunker is not None:
+            chunker.shutdown()
+        for http_client in http_clients:
+            http_client.close()
+        for async_http_client in async_http_clients:
+            await async_http_client.aclose()
+        executor.shutdown(wait=False)
+
     app = FastAPI(
         title="AI 助教課程生成 API",
         description="此 API 提供 AI 助教課程生成相關功能，包括知識庫管理、問題生成及課程大綱等。",
         version="1.0.0",
         openapi_tags=tags_metadata,
+        lifespan=lifespan,
     )
 
     # variables
-    temp_file_name = "user_temp.json"  # 使用者暫存檔案名稱
+    legacy_temp_file_name = "user_temp.json"  # 舊版使用者暫存檔案，啟動時自動匯入
 
     # Initialize configuration and services
     config = Config()
-    gemini_client = config.configure_gemini()
-    embedding_model = config.get_embedding_model()
-    vector_db = VectorDB(config.DB_URL)
+    get_prompt_registry()  # 啟動時載入並檢查所有提示詞模板
+    if gemini_client is None:
+        gemini_client = config.configure_gemini()
+    if vector_db is None:
+        if embedding_model is None:
+            embedding_model = config.get_embedding_model()  # 第一次使用時才載入模型
+        if config.EMBEDDING_WARMUP:
+            threading.Thread(target=embedding_model.warm_up, daemon=True).start()
+        local_index = None
+        # 行程內索引只會看到自己 worker 寫入的向量，多 worker 時改查 pgvector
+        # (uvicorn --workers 的預設值同樣取自 WEB_CONCURRENCY)
+        if config.LOCAL_VECTOR_INDEX and config.WEB_CONCURRENCY <= 1:
+            local_index = LocalVectorIndex(dimension=config.VECTOR_DIMENSION)
+        vector_db = VectorDB(
+            config.DB_URL,
+            embedding_model,
+            collection_name=config.VECTOR_COLLECTION_NAME,
+            dimension=config.VECTOR_DIMENSION,
+            partitions=config.VECTOR_PARTITIONS,
+            local_index_max_rows=config.LOCAL_VECTOR_INDEX_MAX_ROWS,
+            encode_batch_size=config.EMBEDDING_BATCH_SIZE,
+            upsert_batch_size=config.UPSERT_BATCH_SIZE,
+            query_cache_size=config.QUERY_CACHE_SIZE,
+            local_index=local_index,
+            embedding_cache=config.get_embedding_cache(embedding_model),
+        )
+        vector_db.load_local_index(max_rows=config.LOCAL_VECTOR_INDEX_MAX_ROWS)
+    embedding_model = vector_db.embedding_model
     gemini_service = GeminiService(
         gemini_client,
         config.GEMINI_MODEL,
         model_thinking_budget=config.THINKING_BUDGET,
+        profiles=config.get_generation_profiles(),
+        router=ModelRouter(window_seconds=config.GEMINI_ROUTER_WINDOW_SECONDS),
+        response_cache=config.get_response_cache(embedding_model),
+        scheduler=config.get_gemini_scheduler(),
+        max_rate_limit_retries=config.GEMINI_RATE_LIMIT_RETRIES,
     )
-    google_search = GoogleSearch(config.SEARCH_API_KEY, config.SEARCH_ENGINE_ID)
-    api_request_service = APIRequest(api_url=config.WEB_API_URL)
+    # 由這裡建立的 HTTP client 在服務關閉時一併關閉，注入的服務由呼叫端負責
+    http_clients, async_http_clients = [], []
+
+    def create_http_clients() -> dict:
+        http_clients.append(config.create_http_client())
+        async_http_clients.append(config.create_async_http_client())
+        return {
+            "http_client": http_clients[-1],
+            "async_http_client": async_http_clients[-1],
+        }
+
+    if google_search is None:
+        google_search = GoogleSearch(
+            config.SEARCH_API_KEY,
+            config.SEARCH_ENGINE_ID,
+            cache=config.get_search_result_cache(),
+            **create_http_clients(),
+        )
+    if api_request_service is None:
+        api_request_service = APIRequest(
+            api_url=config.WEB_API_URL,
+            check_health_on_start=config.WEB_API_HEALTH_CHECK,
+            **create_http_clients(),
+        )
+    if session_store is None:
+        session_store = config.get_session_store(legacy_temp_file=legacy_temp_file_name)
+    job_tracker = config.get_job_tracker()
+    background_tasks = set()  # 保留背景工作的參照，避免被 GC 回收
+
+    if ingestion_queue is None:
+        ingestion_queue = config.get_ingestion_queue()
+    if outbox is None:
+        outbox = config.get_outbox()
+
+    chunker = config.get_parallel_chunker()
 
     # Initialize use cases
-    insert_knowledge_use_case = InsertKnowledgeUseCase(vector_db, embedding_model)
+    insert_knowledge_use_case = InsertKnowledgeUseCase(
+        vector_db, embedding_model, ingestion_queue=ingestion_queue, chunker=chunker
+    )
+    ingestion_workers = IngestionWorkerPool(
+        ingestion_queue, insert_knowledge_use_case, workers=config.INGESTION_WORKERS
+    )
+    # 生成結果先寫入 outbox 再由背景送往 Web API，使用者不必等待 Web API 回應
+    outbox_dispatcher = OutboxDispatcher(
+        outbox,
+        api_request_service,
+        batch_size=config.OUTBOX_BATCH_SIZE,
+        concurrency=config.OUTBOX_CONCURRENCY,
+        max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+    )
     generate_questions_use_case = GenerateQuestionsUseCase(
         gemini_service, prompt_template_file_name="exploratory_question.txt"
     )
-    create_user_temp_use_case = CreateUserTempUseCase(temp_file_name)
+    create_user_temp_use_case = CreateUserTempUseCase(session_store)
     generate_course_use_case = GenerateCourseUseCase(
         gemini_service,
         vector_db,
         google_search,
         prompt_template_file_name="course_prompt_template.txt",
-        temp_file_name=temp_file_name,
+        session_store=session_store,
+        context_token_budget=config.get_rag_context_token_budget(
+            "course_prompt_template.txt"
+        ),
+        prefetch_ttl=config.RETRIEVAL_PREFETCH_TTL_SECONDS,
     )
     generate_chapter_content_use_case = GenerateChapterContentUseCase(
         gemini_service,
         content_prompt_template_file_name_1="chapter_content_template.txt",
-        practice_prompt_template_file_name_2="chapter_practice_template.txt",
+    )
+    generate_course_chapters_use_case = GenerateCourseChaptersUseCase(
+        generate_chapter_content_use_case,
+        outbox_dispatcher,
+        job_tracker,
+        max_concurrency=config.CHAPTER_GENERATION_CONCURRENCY,
+        max_retries=config.CHAPTER_GENERATION_MAX_RETRIES,
     )
 
+    # Metrics
+    metrics = get_metrics_registry()
+    http_requests_total = metrics.counter(
+        "http_requests_total", "HTTP requests", ("method", "route", "status")
+    )
+    http_request_seconds = metrics.histogram(
+        "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+    )
+    metrics.register_collector(
+        "response_cache", getattr(gemini_service.response_cache, "stats", None)
+    )
+    metrics.register_collector(
+        "gemini_single_flight", gemini_service.single_flight_stats
+    )
+    metrics.register_collector("gemini_scheduler", gemini_service.scheduler.stats)
+    metrics.register_collector(
+        "search_cache", getattr(getattr(google_search, "cache", None), "stats", None)
+    )
+    metrics.register_collector(
+        "query_embedding_cache",
+        getattr(getattr(vector_db, "query_cache", None), "stats", None),
+    )
+    metrics.register_collector(
+        "chunk_embedding_cache",
+        getattr(getattr(vector_db, "embedding_cache", None), "stats", None),
+    )
+    metrics.register_collector("web_api_outbox", outbox.stats)
+    for name, service in (
+        ("google_search", google_search),
+        ("web_api", api_request_service),
+    ):
+        metrics.register_collector(
+            f"{name}_http",
+            getattr(getattr(service, "async_http_client", None), "stats", None),
+        )
+
+    @app.exception_handler(GeminiOverloadedError)
+    async def gemini_overloaded_handler(request: Request, exc: GeminiOverloadedError):
+        headers = {}
+        if exc.retry_after:
+            headers["Retry-After"] = str(math.ceil(exc.retry_after))
+        return JSONResponse(
+            status_code=503, content={"detail": str(exc)}, headers=headers
+        )
+
+    @app.exception_handler(SessionNotFoundError)
+    async def session_not_found_handler(request: Request, exc: SessionNotFoundError):
+        # session 會因 TTL 到期或數量上限被淘汰，需重新呼叫 /ai/generate_questions
+        return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+    @app.exception_handler(GeminiServiceError)
+    async def gemini_error_handler(request: Request, exc: GeminiServiceError):
+        return JSONResponse(status_code=502, content={"detail": str(exc)})
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        trace, token = start_trace(request.method, request.url.path)
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            end_trace(token)
+            # 以路由樣板 (例如 /ai/jobs/{job_id}) 作為 label，避免 label 數量無限增加
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            http_requests_total.inc(
+                method=request.method, route=route, status=status_code
+            )
+            http_request_seconds.observe(
+                time.perf_counter() - trace.start, method=request.method, route=route
+            )
+            if config.REQUEST_TIMING_LOG:
+                print(
+                    f"[RequestTiming] "
+                    f"{json.dumps(trace.to_dict(status_code), ensure_ascii=False)}"
+                )
+
     # Define API endpoints
     @app.get("/health", summary="Health Check", tags=["health-controller"])
-    def health_check():
+    async def health_check():
         return {"status": "ok"}
 
+    @app.get(
+        "/metrics",
+        summary="Prometheus 指標",
+        tags=["health-controller"],
+        response_class=PlainTextResponse,
+    )
+    async def prometheus_metrics():
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4"
+        )
+
     @app.post(
         "/rag/insert_knowledge",
         summary="新增知識到向量資料庫",
         tags=["知識庫模組"],
     )
-    def insert_knowledge(request: KnowledgeRequest):
-        insert_knowledge_use_case.execute([item.content for item in request.knowledge])
-        return {"message": "Knowledge inserted successfully."}
+    async def insert_knowledge(request: KnowledgeRequest):
+        job_id = await insert_knowledge_use_case.enqueue_async(
+            [item.content for item in request.knowledge], request.namespace
+        )
+        ingestion_workers.notify()
+        return {
+            "message": "Knowledge queued for insertion.",
+            "job_id": job_id,
+            "namespace": request.namespace,
+            "status": "queued",
+        }
+
+    @app.post(
+        "/rag/upload_knowledge",
+        summary="上傳文字檔 (txt / md / jsonl) 新增知識",
+        tags=["知識庫模組"],
+    )
+    async def upload_knowledge(
+        request: Request,
+        filename: Optional[str] = None,
+        file_format: Optional[str] = Query(
+            default=None, alias="format", pattern="^(txt|md|jsonl)$"
+        ),
+        namespace: Optional[str] = Query(default=None, pattern=NAMESPACE_PATTERN),
+    ):
+        """
+        request body 為檔案原始內容 (UTF-8，不使用 multipart)，以串流方式寫入暫存檔後排入佇列，例如
+        `curl --data-binary @book.md "http://localhost:8081/rag/upload_knowledge?filename=book.md"`
+
+        格式依 format、filename 副檔名或 Content-Type 判斷；JSONL 每行為字串或含 content 欄位的物件。
+        進度與各階段吞吐量可由 /rag/jobs/{job_id} 查詢。
+        """
+        source_format = file_format or detect_format(
+            filename, request.headers.get("content-type")
+        )
+        if source_format is None:
+            raise HTTPException(
+                status_code=415, detail="Unsupported file format, use txt, md or jsonl"
+            )
+        try:
+            source_path, size = await spool_upload(
+                request.stream(),
+                config.INGESTION_UPLOAD_DIR,
+                suffix=f".{source_format}",
+                max_bytes=config.INGESTION_UPLOAD_MAX_BYTES,
+            )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        job_id = await insert_knowledge_use_case.enqueue_file_async(
+            source_path, source_format, namespace, total_bytes=size
+        )
+        ingestion_workers.notify()
+        return {
+            "message": "File queued for insertion.",
+            "job_id": job_id,
+            "namespace": namespace,
+            "format": source_format,
+            "bytes": size,
+            "status": "queued",
+        }
+
+    @app.get(
+        "/rag/jobs/{job_id}",
+        summary="查詢知識新增工作進度",
+        tags=["知識庫模組"],
+    )
+    async def get_ingestion_job(job_id: str):
+        job = await asyncio.to_thread(ingestion_queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
 
     @app.get(
         "/ai/generate_questions/{userId}/{userInput}",
@@ -87,19 +402,35 @@ def create_app() -> FastAPI:
         tags=["生成課程模組"],
         response_model=UserQuestionRequest,
     )
-    def generate_questions(userId: str, userInput: str):
-        questions = json.loads(
-            generate_questions_use_case.execute(
-                userInput, response_schema=UserQuestionRequest
-            )
+    async def generate_questions(
+        userId: str,
+        userInput: str,
+        namespace: Optional[str] = Query(default=None, pattern=NAMESPACE_PATTERN),
+    ):
+        """
+        namespace: 生成課程時向量檢索使用的知識分區 (課程、科目或租戶)，未指定時使用預設知識庫
+        """
+        use_case = generate_questions_use_case
+        questions_json, search_query = await use_case.execute_with_search_query_async(
+            userInput, response_schema=UserQuestionRequest
         )
-        create_user_temp_use_case.execute(userId, userInput, questions)
+        questions = json.loads(questions_json)
+        await create_user_temp_use_case.execute_async(
+            userId, userInput, questions, search_query=search_query, namespace=namespace
+        )
+        if config.RETRIEVAL_PREFETCH:
+            # 使用者作答期間先完成生成課程所需的檢索
+            generate_course_use_case.start_prefetch(
+                userId, userInput, search_query, namespace
+            )
         return questions
 
     @app.post("/ai/generate_course", summary="生成課程與大綱", tags=["生成課程模組"])
-    def generate_course(request: UserFeedbackRequest):
+    async def generate_course(request: UserFeedbackRequest):
         course = json.loads(
-            generate_course_use_case.execute(request, response_schema=CourseResponse)
+            await generate_course_use_case.execute_async(
+                request, response_schema=CourseResponse
+            )
         )
         create_course_payload = {
             "name": course["course_name"],
@@ -125,7 +456,7 @@ def create_app() -> FastAPI:
             create_course_payload["sections"].append(section_template)
             create_course_payload["outline"] += f"{section_template['sectionName']}\n"
         print(create_course_payload)
-        api_request_service.execute(
+        await outbox_dispatcher.enqueue_async(
             "POST", endpoint="courses/detail", payload=create_course_payload
         )
         return course
@@ -135,15 +466,93 @@ def create_app() -> FastAPI:
         summary="生成課程章節內容",
         tags=["生成課程模組"],
     )
-    def generate_chapter_content(request: CourseContentRequest):
+    async def generate_chapter_content(request: CourseContentRequest):
         chapter_content = json.loads(
-            generate_chapter_content_use_case.execute(
+            await generate_chapter_content_use_case.execute_async(
                 request, response_schema=CourseContentResponse
             )
         )
-        api_request_service.execute(
+        delivery_id = await outbox_dispatcher.enqueue_async(
             "PUT", endpoint=f"chapters/{request.chapter_id}", payload=chapter_content
         )
-        return {"message": "Chapter content generated successfully."}
+        return {
+            "message": "Chapter content generated successfully.",
+            "delivery_id": delivery_id,
+        }
+
+    @app.post(
+        "/ai/generate_chapter_content/stream",
+        summary="以 SSE 串流生成課程章節內容",
+        tags=["生成課程模組"],
+    )
+    async def generate_chapter_content_stream(request: CourseContentRequest):
+        """
+        事件格式:
+        - delta: {"text": 新生成的章節內容片段}
+        - done: {"chapter_id": ..., "content": 完整章節內容}
+        - error: {"message": 錯誤訊息}
+        """
+
+        async def event_stream():
+            decoder = JsonStringFieldStreamDecoder("content")
+            try:
+                async for text in generate_chapter_content_use_case.stream_async(
+                    request, response_schema=CourseContentResponse
+                ):
+                    delta = decoder.feed(text)
+                    if delta:
+                        yield sse_event("delta", {"text": delta})
+                chapter_content = CourseContentResponse.model_validate_json(
+                    decoder.text
+                ).model_dump()
+                await outbox_dispatcher.enqueue_async(
+                    "PUT",
+                    endpoint=f"chapters/{request.chapter_id}",
+                    payload=chapter_content,
+                )
+                yield sse_event(
+                    "done", {"chapter_id": request.chapter_id, **chapter_content}
+                )
+            except Exception as e:
+                print(f"[generate_chapter_content_stream] Error: {e}")
+                yield sse_event("error", {"message": str(e)})
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.post(
+        "/ai/generate_course_chapters",
+        summary="批次生成整門課程的章節內容",
+        tags=["生成課程模組"],
+    )
+    async def generate_course_chapters(request: CourseChaptersRequest):
+        job_id = await generate_course_chapters_use_case.create_job_async(request)
+        task = asyncio.create_task(
+            generate_course_chapters_use_case.execute_async(job_id, request)
+        )
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        return {"job_id": job_id}
+
+    @app.get(
+        "/ai/deliveries/{delivery_id}",
+        summary="查詢生成結果寫回 Web API 的狀態",
+        tags=["生成課程模組"],
+    )
+    async def get_delivery_status(delivery_id: str):
+        delivery = await asyncio.to_thread(outbox.get, delivery_id)
+        if delivery is None:
+            raise HTTPException(status_code=404, detail="Delivery not found")
+        return delivery
+
+    @app.get("/ai/jobs/{job_id}", summary="查詢背景工作進度", tags=["生成課程模組"])
+    async def get_job_status(job_id: str):
+        job = await asyncio.to_thread(job_tracker.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
 
     return app
@@ -0,0 +1,105 @@
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+
+def _bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_prefork(
+    app_factory: Callable[[], FastAPI],
+    host: str,
+    port: int,
+    workers: int,
+    preload: Optional[Callable[[], None]] = None,
+    on_worker_start: Optional[Callable[[int], None]] = None,
+    restart_delay: float = 1.0,
+):
+    """
+    以 prefork 方式啟動多個 uvicorn worker
+
+    1. 主行程先建立監聽 socket 並執行 preload (載入 embedding 模型權重、提示詞模板)
+    2. gc.freeze() 後 fork 出 workers 個子行程，預先載入的物件以 copy-on-write 方式共用
+    3. 每個 worker 在 fork 之後才呼叫 app_factory，建立各自的 HTTP 連線、資料庫連線與執行緒
+
+    uvicorn 內建的 --workers 以 spawn 建立子行程，無法共用主行程已載入的記憶體。
+    worker 異常結束時會重新啟動；主行程收到 SIGTERM / SIGINT 時通知所有 worker 結束。
+    """
+    sock = _bind_socket(host, port)
+    if preload is not None:
+        preload()
+    # 將目前的物件移出 GC 追蹤，避免子行程的 GC 寫入物件標頭而複製共用的記憶體分頁
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}  # pid -> worker index
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid != 0:
+            children[pid] = index
+            return
+        # 子行程
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            if on_worker_start is not None:
+                on_worker_start(index)
+            server = uvicorn.Server(uvicorn.Config(app_factory(), lifespan="on"))
+            server.run(sockets=[sock])
+        except BaseException as e:
+            print(f"[PreforkServer] Worker {index} crashed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(
+        f"[PreforkServer] Master {os.getpid()} listening on {host}:{port} "
+        f"with {workers} workers"
+    )
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        print(
+            f"[PreforkServer] Worker {index} (pid {pid}) exited with "
+            f"status {os.waitstatus_to_exitcode(status)}, restarting"
+        )
+        time.sleep(restart_delay)
+        if not stopping:
+            spawn(index)
+    sock.close()
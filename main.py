@@ -1,8 +1,78 @@
-import uvicorn
+import os
 
-from interfaces.api.fastapi_app import create_app
+_app = None
+
+
+def __getattr__(name):
+    # 保留 `uvicorn main:app` 的啟動方式；app 在第一次取用時才建立，
+    # 切割文件的 spawn 子行程重新匯入此模組時不會建立整個應用程式
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        from interfaces.api.fastapi_app import create_app
+
+        _app = create_app()
+    return _app
+
+
+def limit_torch_threads(workers: int):
+    """
+    多個 worker 共用 CPU 時，平均分配每個 worker 的 PyTorch 運算執行緒
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max((os.cpu_count() or 1) // workers, 1))
+
+
+def main():
+    # 切割文件的 process pool 以 spawn 建立子行程，子行程會重新匯入此模組，
+    # 因此應用程式只在實際啟動服務時才匯入
+    import uvicorn
+
+    from application.use_cases.prompt_loader import get_prompt_registry
+    from infrastructure.config import Config
+    from interfaces.api.fastapi_app import create_app
+    from interfaces.api.prefork_server import serve_prefork
+
+    config = Config()
+    # 重啟前執行中的工作已隨舊行程結束，啟動 worker 前標記為 interrupted
+    interrupted = config.get_job_tracker().interrupt_unfinished()
+    if interrupted:
+        print(f"[main] Marked {interrupted} unfinished jobs as interrupted")
+    if config.WEB_CONCURRENCY <= 1:
+        uvicorn.run(create_app(), host=config.WEB_HOST, port=config.WEB_PORT)
+        return
+
+    if config.SESSION_BACKEND == "memory" or config.JOB_TRACKER_BACKEND == "memory":
+        print(
+            "[main] Warning: memory session / job backends are not shared between "
+            "workers, use sqlite with WEB_CONCURRENCY > 1"
+        )
+    if config.LOCAL_VECTOR_INDEX:
+        print(
+            "[main] Warning: LOCAL_VECTOR_INDEX is disabled with WEB_CONCURRENCY > 1, "
+            "each worker would only see its own writes; querying pgvector instead"
+        )
+    embedding_model = config.get_embedding_model()
+
+    def preload():
+        get_prompt_registry()
+        # 只載入權重不執行 encode: 執行過推論後 OpenMP / ONNX Runtime 的執行緒池在 fork 後無法使用
+        if config.PRELOAD_EMBEDDING_MODEL and config.EMBEDDING_BACKEND == "torch":
+            embedding_model.load()
+
+    serve_prefork(
+        lambda: create_app(embedding_model=embedding_model),
+        host=config.WEB_HOST,
+        port=config.WEB_PORT,
+        workers=config.WEB_CONCURRENCY,
+        preload=preload,
+        on_worker_start=lambda index: limit_torch_threads(config.WEB_CONCURRENCY),
+    )
 
-app = create_app()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8081)
+    main()